@@ -0,0 +1,182 @@
+"""Measure decoding accuracy and throughput under model-like image distortions.
+
+Run with: python benchmarks/bench_decoding.py [--dataset DIR] [--grids N]
+          [--seed S] [--output report.json]
+
+Grids (random ARC-like ones, or test outputs from --dataset) are rendered
+with grid_to_image, distorted, encoded as PNG or JPEG and decoded back
+through ARCSolver.image_to_grid with each strategy. The JSON report holds,
+per distortion and strategy, the share of exactly recovered grids, the share
+of correct cells and images decoded per second (including decompression).
+GEMINI_API_KEY must be set to construct the solver; no requests are made.
+"""
+
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from banana_agi.dataset_loader import (
+    MIN_CELL_SIZE,
+    MODEL_TILE_SIZE,
+    choose_cell_size,
+    grid_to_image,
+    load_all_arc_tasks,
+)
+from banana_agi.solver import ARCSolver
+
+# image_to_grid keyword arguments per strategy; "detected" decodes without
+# expected dimensions
+STRATEGIES = {
+    "center": {"strategy": "center"},
+    "vote": {"strategy": "vote"},
+    "trimmed": {"strategy": "trimmed"},
+    "trimmed-calibrated": {"strategy": "trimmed", "calibrate": True},
+    "trimmed-aligned": {"strategy": "trimmed", "align": True},
+    "trimmed-detected": {"strategy": "trimmed", "detect": True},
+}
+
+
+def encode(img, fmt="PNG", **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def jpeg(img, rng):
+    return encode(img, "JPEG", quality=int(rng.integers(50, 80)))
+
+
+def resample(img, rng):
+    scale = rng.uniform(0.7, 1.4, size=2)
+    size = (int(img.width * scale[0]) | 1, int(img.height * scale[1]) | 1)
+    return encode(img.resize(size, Image.BICUBIC))
+
+
+def noise(img, rng):
+    pixels = np.asarray(img).astype(np.float64)
+    noisy = pixels + rng.normal(0, 12, pixels.shape)
+    return encode(Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8)))
+
+
+def shift(img, rng):
+    dx, dy = rng.integers(-3, 4, size=2)
+    shifted = img.transform(
+        img.size, Image.AFFINE, (1, 0, dx, 0, 1, dy), fillcolor=(255, 255, 255)
+    )
+    return encode(shifted)
+
+
+def border(img, rng):
+    widths = tuple(int(w) for w in rng.integers(4, 40, size=4))
+    return encode(ImageOps.expand(img, widths, fill=(255, 255, 255)))
+
+
+def color_drift(img, rng):
+    pixels = np.asarray(img).astype(np.float64)
+    drifted = pixels * rng.uniform(0.6, 1.0) + rng.uniform(-30, 60, size=3)
+    return encode(Image.fromarray(np.clip(drifted, 0, 255).astype(np.uint8)))
+
+
+DISTORTIONS = {
+    "none": lambda img, rng: encode(img),
+    "jpeg": jpeg,
+    "resample": resample,
+    "noise": noise,
+    "shift": shift,
+    "border": border,
+    "color_drift": color_drift,
+}
+
+
+def random_grids(count, rng):
+    grids = []
+    for _ in range(count):
+        rows, cols = rng.integers(3, 31, size=2)
+        grid = rng.integers(0, 10, size=(rows, cols))
+        # Most ARC grids are a few colored cells on black
+        grid[rng.random((rows, cols)) < 0.6] = 0
+        grids.append(grid)
+    return grids
+
+
+def dataset_grids(dataset_dir, count):
+    grids = []
+    for task_data in load_all_arc_tasks(dataset_dir).values():
+        grids.extend(np.array(test["output"]) for test in task_data["test"])
+    return grids[:count]
+
+
+def decode_all(solver, samples, options):
+    options = dict(options)
+    detect = options.pop("detect", False)
+    # Warm up lazily built tables so they are not timed
+    solver.image_to_grid(Image.open(io.BytesIO(samples[0][0])), **options)
+    decoded = []
+    start = time.perf_counter()
+    for data, grid in samples:
+        rows, cols = (None, None) if detect else grid.shape
+        img = Image.open(io.BytesIO(data))
+        decoded.append(solver.image_to_grid(img, rows, cols, **options))
+    return decoded, time.perf_counter() - start
+
+
+def score(decoded, samples):
+    exact = cells = total = 0
+    for result, (_, grid) in zip(decoded, samples):
+        result = np.array(result)
+        total += grid.size
+        if result.shape == grid.shape:
+            exact += np.array_equal(result, grid)
+            cells += int((result == grid).sum())
+    return exact / len(samples), cells / total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=None)
+    parser.add_argument("--grids", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.dataset:
+        grids = dataset_grids(args.dataset, args.grids)
+    else:
+        grids = random_grids(args.grids, rng)
+    solver = ARCSolver(output_dir=None)
+
+    report = {
+        "grids": len(grids),
+        "seed": args.seed,
+        "source": args.dataset or "random",
+        "results": {},
+    }
+    for name, distort in DISTORTIONS.items():
+        samples = []
+        for grid in grids:
+            cell_size = choose_cell_size(grid.shape, MODEL_TILE_SIZE, MIN_CELL_SIZE)
+            samples.append((distort(grid_to_image(grid, cell_size), rng), grid))
+        report["results"][name] = {}
+        for strategy, options in STRATEGIES.items():
+            decoded, seconds = decode_all(solver, samples, options)
+            grid_accuracy, cell_accuracy = score(decoded, samples)
+            report["results"][name][strategy] = {
+                "grid_accuracy": grid_accuracy,
+                "cell_accuracy": cell_accuracy,
+                "images_per_second": len(samples) / seconds,
+            }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the vectorized grid_to_image against the original per-pixel renderer.
+
+Run with: python benchmarks/bench_grid_to_image.py
+"""
+
+import timeit
+
+import numpy as np
+from PIL import Image
+
+from banana_agi.dataset_loader import ARC_COLORS, grid_to_image
+
+SIZES = [1, 2, 3, 5, 10, 15, 20, 25, 30]
+CELL_SIZE = 20
+
+
+def legacy_grid_to_image(grid, cell_size=20):
+    """Original implementation: one Python-level write per pixel."""
+    grid = np.array(grid)
+    height, width = grid.shape
+
+    img = Image.new("RGB", (width * cell_size, height * cell_size))
+    pixels = img.load()
+
+    for y in range(height):
+        for x in range(width):
+            color = ARC_COLORS[grid[y, x]]
+            for dy in range(cell_size):
+                for dx in range(cell_size):
+                    pixels[x * cell_size + dx, y * cell_size + dy] = color
+
+    return img
+
+
+def time_call(func, *args):
+    timer = timeit.Timer(lambda: func(*args))
+    number, _ = timer.autorange()
+    number = max(number, 1)
+    best = min(timer.repeat(repeat=3, number=number))
+    return best / number
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"cell_size={CELL_SIZE}")
+    print(f"{'grid':>7} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>9}")
+    for size in SIZES:
+        grid = rng.integers(0, 10, size=(size, size)).tolist()
+
+        assert np.array_equal(
+            np.array(legacy_grid_to_image(grid, CELL_SIZE)),
+            np.array(grid_to_image(grid, CELL_SIZE)),
+        ), f"Output mismatch for {size}x{size}"
+
+        legacy = time_call(legacy_grid_to_image, grid, CELL_SIZE)
+        vectorized = time_call(grid_to_image, grid, CELL_SIZE)
+        print(
+            f"{size:>3}x{size:<3} {legacy * 1e3:>12.3f} {vectorized * 1e3:>16.3f} "
+            f"{legacy / vectorized:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
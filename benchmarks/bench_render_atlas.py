@@ -0,0 +1,60 @@
+"""Benchmark batch atlas rendering against rendering grids one at a time.
+
+Run with: python benchmarks/bench_render_atlas.py [dataset_dir]
+
+Uses the ARC tasks in dataset_dir when available, otherwise random grids with
+ARC-like shapes.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from banana_agi.dataset_loader import (
+    grid_to_image,
+    load_all_arc_tasks,
+    render_atlas,
+    task_grids,
+)
+
+NUM_SYNTHETIC_GRIDS = 10_000
+
+
+def load_grids(dataset_dir):
+    if os.path.isdir(dataset_dir):
+        tasks = load_all_arc_tasks(dataset_dir)
+        return [grid for task in tasks.values() for _, grid in task_grids(task)]
+
+    rng = np.random.default_rng(0)
+    grids = []
+    for _ in range(NUM_SYNTHETIC_GRIDS):
+        rows, cols = rng.integers(1, 31, size=2)
+        grids.append(rng.integers(0, 10, size=(rows, cols)).tolist())
+    return grids
+
+
+def main():
+    dataset_dir = sys.argv[1] if len(sys.argv) > 1 else "ARC-AGI-2/data/evaluation"
+    grids = load_grids(dataset_dir)
+    print(f"{len(grids)} grids")
+
+    for mode in ("RGB", "P"):
+        start = time.perf_counter()
+        for grid in grids:
+            grid_to_image(grid, mode=mode)
+        per_grid = time.perf_counter() - start
+
+        start = time.perf_counter()
+        atlas, _ = render_atlas(grids, mode=mode)
+        batched = time.perf_counter() - start
+
+        print(
+            f"{mode:>3}: per-grid {per_grid:.3f}s, atlas {batched:.3f}s "
+            f"({per_grid / batched:.1f}x, {atlas.nbytes / 1e6:.1f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
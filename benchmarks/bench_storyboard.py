@@ -0,0 +1,67 @@
+"""Compare multipart and storyboard request modes on the same tasks.
+
+Run with: python benchmarks/bench_storyboard.py [dataset_dir] [--tasks N] [--dry-run]
+
+Reports payload bytes per request for both modes and, unless --dry-run is
+given, request latency and accuracy from live API calls. GEMINI_API_KEY must
+be set in both cases; --dry-run only builds the requests.
+"""
+
+import argparse
+import json
+import statistics
+
+from banana_agi.dataset_loader import load_all_arc_tasks
+from banana_agi.solver import REQUEST_MODES, ARCSolver, payload_bytes
+
+
+def build_payloads(solver, tasks):
+    sizes = []
+    for task_data in tasks.values():
+        train_examples = task_data["train"]
+        for test_example in task_data["test"]:
+            if solver.request_mode == "storyboard":
+                contents, _ = solver.storyboard_contents(train_examples, test_example)
+            else:
+                contents = solver.multipart_contents(train_examples, test_example)
+            sizes.append(payload_bytes(contents))
+    return sizes
+
+
+def run_live(solver, tasks):
+    accuracies = []
+    for task_name, task_data in tasks.items():
+        predictions = solver.solve_task(task_data, task_name)
+        ground_truth = [test_ex["output"] for test_ex in task_data["test"]]
+        accuracies.append(solver.calculate_accuracy(predictions, ground_truth))
+    latencies = [entry["latency"] for entry in solver.request_log]
+    return statistics.mean(accuracies), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset_dir", nargs="?", default="ARC-AGI-2/data/evaluation")
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    tasks = dict(list(load_all_arc_tasks(args.dataset_dir).items())[: args.tasks])
+    report = {}
+    for mode in REQUEST_MODES:
+        solver = ARCSolver(request_mode=mode)
+        sizes = build_payloads(solver, tasks)
+        report[mode] = {
+            "requests": len(sizes),
+            "mean_payload_bytes": statistics.mean(sizes),
+            "total_payload_bytes": sum(sizes),
+        }
+        if not args.dry_run:
+            accuracy, median_latency = run_live(solver, tasks)
+            report[mode]["accuracy"] = accuracy
+            report[mode]["median_latency"] = median_latency
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
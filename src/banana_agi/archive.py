@@ -0,0 +1,182 @@
+import glob
+import io
+import json
+import os
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from banana_agi.dataset_loader import encode_task_images, load_arc_task
+
+INDEX_NAME = "index.json"
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+TAR_BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+def member_name(task_name: str, split: str, index: int, kind: str = "input") -> str:
+    """Archive member name of a grid, matching the per-task directory export layout."""
+    return f"{task_name}/{split}_{index}_{kind}.png"
+
+
+class ShardedArchiveWriter:
+    """Stream PNG images into uncompressed tar shards of bounded size.
+
+    Every member's shard and byte range are recorded in an index file written on
+    close, so readers can seek straight to an image. Shards remain valid tar
+    files and can also be unpacked with standard tools.
+    """
+
+    def __init__(
+        self, archive_dir: str, shard_size: int = DEFAULT_SHARD_SIZE, prefix="shard"
+    ):
+        if shard_size <= 0:
+            raise ValueError("shard_size must be positive")
+        self.archive_dir = archive_dir
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.shards = []
+        self.entries = {}
+        self._tar = None
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, name: str, data: bytes):
+        """Append one member, starting a new shard when the current one is full."""
+        if name in self.entries:
+            raise ValueError(f"Duplicate archive member: {name}")
+        if self._tar is None or (
+            self._tar.offset > 0 and self._tar.offset + len(data) > self.shard_size
+        ):
+            self._open_next_shard()
+
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+        # The payload ends the member, padded to a whole number of tar blocks
+        padded = -(-len(data) // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+        offset = self._tar.offset - padded
+        self.entries[name] = [len(self.shards) - 1, offset, len(data)]
+
+    def close(self):
+        """Close the current shard and write the index."""
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+        index_path = os.path.join(self.archive_dir, INDEX_NAME)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"shards": self.shards, "entries": self.entries}, f)
+        os.replace(index_path + ".tmp", index_path)
+
+    def _open_next_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+        shard_name = f"{self.prefix}-{len(self.shards):05d}.tar"
+        self.shards.append(shard_name)
+        self._tar = tarfile.open(os.path.join(self.archive_dir, shard_name), "w")
+
+
+class ShardedArchiveReader:
+    """Random access to images written by ShardedArchiveWriter, without unpacking."""
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        with open(os.path.join(archive_dir, INDEX_NAME), "r") as f:
+            index = json.load(f)
+        self.shards = index["shards"]
+        self.entries = index["entries"]
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def names(self) -> list[str]:
+        """Return all member names."""
+        return list(self.entries)
+
+    def read_member(self, name: str) -> bytes:
+        """Return the raw bytes of a member."""
+        shard, offset, size = self.entries[name]
+        f = self._files.get(shard)
+        if f is None:
+            f = open(os.path.join(self.archive_dir, self.shards[shard]), "rb")
+            self._files[shard] = f
+        f.seek(offset)
+        return f.read(size)
+
+    def read(self, task_name: str, split: str, index: int, kind: str = "input"):
+        """Return the PNG bytes of one grid."""
+        return self.read_member(member_name(task_name, split, index, kind))
+
+    def open_image(self, task_name: str, split: str, index: int, kind: str = "input"):
+        """Return one grid as a PIL image."""
+        return Image.open(io.BytesIO(self.read(task_name, split, index, kind)))
+
+    def close(self):
+        """Close all open shard files."""
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def encode_task_file(task_file: str):
+    """Encode every grid of a task file; returns (task_name, [(member, bytes)])."""
+    task_name = os.path.splitext(os.path.basename(task_file))[0]
+    members = [
+        (f"{task_name}/{name}.png", data)
+        for name, data in encode_task_images(load_arc_task(task_file))
+    ]
+    return task_name, members
+
+
+def export_dataset_archive(
+    dataset_dir: str,
+    archive_dir: str,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int | None = None,
+) -> dict:
+    """Export every task of a dataset into a sharded archive.
+
+    Tasks are encoded on a process pool (in process when workers=1) and
+    streamed into the shards in task order. Returns export statistics.
+    """
+    start = time.perf_counter()
+    task_files = sorted(glob.glob(os.path.join(dataset_dir, "*.json")))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    num_grids = 0
+    try:
+        results = (pool.map if pool else map)(encode_task_file, task_files)
+        with ShardedArchiveWriter(archive_dir, shard_size=shard_size) as writer:
+            for _, members in results:
+                for name, data in members:
+                    writer.add(name, data)
+                num_grids += len(members)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "tasks": len(task_files),
+        "grids": num_grids,
+        "shards": len(writer.shards),
+        "seconds": elapsed,
+        "grids_per_second": num_grids / elapsed if elapsed > 0 else 0.0,
+    }
@@ -1,8 +1,37 @@
 import json
+import hashlib
+import functools
+from collections import namedtuple
 import numpy as np
 from PIL import Image
+from banana_agi.palette import (
+    ARC_COLORS,
+    ARC_PALETTE,
+    ARC_PALETTE_BYTES,
+    BACKGROUND_INDEX,
+    GRIDLINE_INDEX,
+    RENDER_PALETTE,
+    RENDER_PALETTE_BYTES,
+)
+from banana_agi.png_encoder import encode_png
 import os
 import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Gemini bills an image whose sides are both <= 384px as a single tile
+MODEL_TILE_SIZE = 384
+# Smallest cell size that stays legible to the model
+MIN_CELL_SIZE = 8
+
+# Pixel widths of the gridlines drawn between cells, the frame drawn around
+# the grid and the padding inside each cell; all zero renders plain cells
+RenderStyle = namedtuple('RenderStyle', ['gridline', 'border', 'padding'], defaults=[0, 0, 0])
+PLAIN_STYLE = RenderStyle()
+
+MANIFEST_NAME = 'manifest.json'
+# Bump when the exported image format changes so existing exports are redone
+EXPORT_VERSION = 1
 
 def load_arc_task(task_file):
     """Load a single ARC-AGI task from JSON file."""
@@ -21,58 +50,263 @@ def load_all_arc_tasks(dataset_dir):
     
     return tasks
 
-def grid_to_image(grid, cell_size=20):
-    """Convert a grid to an image with colors for each value."""
-    colors = [
-        (0, 0, 0),        # 0: black
-        (0, 116, 217),    # 1: blue
-        (255, 65, 54),    # 2: red
-        (46, 204, 64),    # 3: green
-        (255, 220, 0),    # 4: yellow
-        (170, 170, 170),  # 5: gray
-        (240, 18, 190),   # 6: magenta
-        (255, 133, 27),   # 7: orange
-        (127, 219, 255),  # 8: sky blue
-        (135, 12, 37),    # 9: maroon
-    ]
-    
-    grid = np.array(grid)
-    height, width = grid.shape
-    
-    img = Image.new('RGB', (width * cell_size, height * cell_size))
-    pixels = img.load()
+def expand_cells(cells, cell_size):
+    """Expand each cell of a (rows, cols, ...) array into a cell_size x cell_size block."""
+    # Widen each row first, then copy whole pixel rows: both steps stay contiguous
+    rows = np.repeat(cells, cell_size, axis=1)
+    return np.repeat(rows, cell_size, axis=0)
+
+def choose_cell_size(shape, max_side=MODEL_TILE_SIZE, min_cell_size=MIN_CELL_SIZE):
+    """Pick the largest cell size keeping a (rows, cols) grid within max_side pixels.
+
+    Never goes below min_cell_size, so very large grids may exceed max_side.
+    """
+    rows, cols = shape
+    return max(min_cell_size, max_side // max(rows, cols, 1))
+
+@functools.lru_cache(maxsize=256)
+def cell_template(cell_size, style):
+    """Precomputed (cell_size, cell_size) tile for a style.
+
+    Returns a boolean mask of the pixels showing the cell color and, for the
+    other pixels, the palette index they take (gridline or padding).
+    """
+    inner = cell_size - style.gridline - 2 * style.padding
+    if inner < 1:
+        raise ValueError(f"Style {style} leaves no room for cells of size {cell_size}")
+
+    # Gridlines take the bottom/right edge of each tile, padding surrounds the cell
+    fill = np.full((cell_size, cell_size), BACKGROUND_INDEX, dtype=np.uint8)
+    fill[cell_size - style.gridline:, :] = GRIDLINE_INDEX
+    fill[:, cell_size - style.gridline:] = GRIDLINE_INDEX
+    is_cell = np.zeros((cell_size, cell_size), dtype=bool)
+    is_cell[style.padding:style.padding + inner, style.padding:style.padding + inner] = True
+
+    fill.flags.writeable = False
+    is_cell.flags.writeable = False
+    return is_cell, fill
+
+def stamp_cells(values, cell_size, style):
+    """Render (rows, cols) palette indices as styled tiles of palette indices."""
+    is_cell, fill = cell_template(cell_size, style)
+    height, width = values.shape
+    tiles = np.where(
+        is_cell[None, :, None, :],
+        values[:, None, :, None],
+        fill[None, :, None, :],
+    )
+    pixels = tiles.reshape(height * cell_size, width * cell_size)
+    if style.gridline:
+        # Close the top and left edges so every cell is enclosed by gridlines
+        pixels = np.pad(pixels, ((style.gridline, 0), (style.gridline, 0)), constant_values=GRIDLINE_INDEX)
+    if style.border:
+        pixels = np.pad(pixels, style.border, constant_values=GRIDLINE_INDEX)
+    return pixels
+
+def grid_to_pixels(grid, cell_size=20, mode='RGB', style=None):
+    """Render a grid to a uint8 array: (H, W, 3) colors for 'RGB', (H, W) indices for 'P'."""
+    if mode not in ('RGB', 'P'):
+        raise ValueError(f"Unsupported image mode: {mode}")
+
+    grid = np.asarray(grid)
+    if grid.ndim != 2:
+        raise ValueError(f"Expected a 2D grid, got shape {grid.shape}")
     
-    for y in range(height):
-        for x in range(width):
-            color = colors[grid[y, x]]
-            for dy in range(cell_size):
-                for dx in range(cell_size):
-                    pixels[x * cell_size + dx, y * cell_size + dy] = color
+    if style is not None and style != PLAIN_STYLE:
+        indices = stamp_cells(grid.astype(np.uint8), cell_size, RenderStyle(*style))
+        return indices if mode == 'P' else RENDER_PALETTE[indices]
     
+    if mode == 'P':
+        return expand_cells(grid.astype(np.uint8), cell_size)
+    return expand_cells(ARC_PALETTE[grid], cell_size)
+
+def grid_to_image(grid, cell_size=20, mode='RGB', style=None):
+    """Convert a grid to an image with colors for each value.
+
+    mode='RGB' renders 24-bit colors. mode='P' renders 8-bit palette indices
+    (the grid values themselves) with the render palette attached. style is a
+    RenderStyle adding gridlines, a frame or cell padding.
+    """
+    return pixels_to_image(grid_to_pixels(grid, cell_size, mode, style))
+
+def pixels_to_image(pixels):
+    """Wrap rendered pixels in a PIL image: (H, W) palette indices or (H, W, 3) RGB."""
+    img = Image.fromarray(pixels)
+    if pixels.ndim == 2:
+        img.putpalette(RENDER_PALETTE_BYTES)
     return img
 
+def render_atlas(grids, cell_size=20, mode='RGB'):
+    """Render many grids into a single preallocated flat uint8 atlas.
+
+    Grids sharing a shape are stacked and expanded in one vectorized step
+    written straight into the atlas, so the cost scales with the number of
+    distinct shapes rather than the number of grids. Returns the atlas and,
+    for each input grid, a (start, stop, shape) slice such that
+    atlas[start:stop].reshape(shape) is that grid's rendered pixels.
+    """
+    if mode not in ('RGB', 'P'):
+        raise ValueError(f"Unsupported image mode: {mode}")
+    channels = (3,) if mode == 'RGB' else ()
+
+    arrays = [np.asarray(grid, dtype=np.uint8) for grid in grids]
+    by_shape = {}
+    for i, grid in enumerate(arrays):
+        if grid.ndim != 2:
+            raise ValueError(f"Expected a 2D grid, got shape {grid.shape}")
+        by_shape.setdefault(grid.shape, []).append(i)
+
+    # Lay out each shape group contiguously
+    slices = [None] * len(arrays)
+    layout = []
+    total = 0
+    for (height, width), indices in by_shape.items():
+        shape = (height * cell_size, width * cell_size) + channels
+        size = int(np.prod(shape))
+        layout.append((total, total + size * len(indices), (height, width), indices))
+        for i in indices:
+            slices[i] = (total, total + size, shape)
+            total += size
+
+    atlas = np.empty(total, dtype=np.uint8)
+    for start, stop, (height, width), indices in layout:
+        stack = np.stack([arrays[i] for i in indices])
+        if mode == 'RGB':
+            stack = ARC_PALETTE[stack]
+        blocks = atlas[start:stop].reshape(
+            (len(indices), height, cell_size, width * cell_size) + channels
+        )
+        blocks[...] = np.repeat(stack, cell_size, axis=2)[:, :, None]
+
+    return atlas, slices
+
+def atlas_views(atlas, slices):
+    """Return zero-copy per-grid pixel views into an atlas from render_atlas."""
+    return [atlas[start:stop].reshape(shape) for start, stop, shape in slices]
+
+def task_grids(task_data):
+    """List (name, grid) pairs for every grid of a task, e.g. ('train_0_input', grid)."""
+    named = []
+    for split in ('train', 'test'):
+        for i, example in enumerate(task_data.get(split, [])):
+            named.append((f'{split}_{i}_input', example['input']))
+            # Some test examples might not have outputs
+            if 'output' in example:
+                named.append((f'{split}_{i}_output', example['output']))
+    return named
+
+def has_arc_palette(img):
+    """Check whether an image is a palettized ARC render whose indices are grid values."""
+    if img.mode != 'P':
+        return False
+    palette = img.getpalette()
+    if palette is None or bytes(palette[:len(ARC_PALETTE_BYTES)]) != ARC_PALETTE_BYTES:
+        return False
+    return img.getextrema()[1] < len(ARC_COLORS)
+
+def encode_task_images(task_data):
+    """Render and PNG-encode every grid of a task; returns (name, png bytes) pairs."""
+    # Render every grid of the task in one atlas pass
+    named = task_grids(task_data)
+    atlas, slices = render_atlas([grid for _, grid in named], mode='P')
+    return [(name, encode_png(pixels)) for (name, _), pixels in zip(named, atlas_views(atlas, slices))]
+
 def transform_task_to_images(task_data, output_dir, task_name):
     """Transform input/output couples to images for a single task."""
     task_dir = os.path.join(output_dir, task_name)
     os.makedirs(task_dir, exist_ok=True)
     
-    # Process training examples
-    for i, example in enumerate(task_data.get('train', [])):
-        input_img = grid_to_image(example['input'])
-        output_img = grid_to_image(example['output'])
-        
-        input_img.save(os.path.join(task_dir, f'train_{i}_input.png'))
-        output_img.save(os.path.join(task_dir, f'train_{i}_output.png'))
+    encoded = encode_task_images(task_data)
+    for name, data in encoded:
+        with open(os.path.join(task_dir, f'{name}.png'), 'wb') as f:
+            f.write(data)
     
-    # Process test examples
-    for i, example in enumerate(task_data.get('test', [])):
-        input_img = grid_to_image(example['input'])
-        input_img.save(os.path.join(task_dir, f'test_{i}_input.png'))
-        
-        # Some test examples might not have outputs
-        if 'output' in example:
-            output_img = grid_to_image(example['output'])
-            output_img.save(os.path.join(task_dir, f'test_{i}_output.png'))
+    return len(encoded)
+
+def file_digest(path):
+    """SHA-256 of a file's bytes."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_manifest(output_dir):
+    """Load the export manifest mapping task names to source JSON digests."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != EXPORT_VERSION:
+        return {}
+    return manifest.get('tasks', {})
+
+def save_manifest(output_dir, task_digests):
+    """Atomically write the export manifest."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': EXPORT_VERSION, 'tasks': task_digests}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def export_task_file(task_file, output_dir):
+    """Export one task JSON file to images; returns (task_name, number of grids)."""
+    task_name = os.path.splitext(os.path.basename(task_file))[0]
+    return task_name, transform_task_to_images(load_arc_task(task_file), output_dir, task_name)
+
+def export_dataset(dataset_dir, output_dir, workers=None, force=False):
+    """Export every task of a dataset to images, in parallel and incrementally.
+
+    Tasks whose source JSON digest matches the manifest and whose output
+    directory still exists are skipped unless force is set. workers=1 runs in
+    process; otherwise tasks are spread over a process pool. Returns export
+    statistics including throughput in grids per second.
+    """
+    start = time.perf_counter()
+    json_files = sorted(glob.glob(os.path.join(dataset_dir, "*.json")))
+    previous = {} if force else load_manifest(output_dir)
+    
+    digests = {}
+    pending = []
+    exported = {}
+    for json_file in json_files:
+        task_name = os.path.splitext(os.path.basename(json_file))[0]
+        digests[task_name] = file_digest(json_file)
+        up_to_date = (
+            previous.get(task_name) == digests[task_name]
+            and os.path.isdir(os.path.join(output_dir, task_name))
+        )
+        if up_to_date:
+            exported[task_name] = digests[task_name]
+        else:
+            pending.append(json_file)
+    
+    # Tasks are only recorded in the manifest once their export finished
+    num_grids = 0
+    try:
+        if workers == 1 or len(pending) <= 1:
+            for json_file in pending:
+                task_name, count = export_task_file(json_file, output_dir)
+                exported[task_name] = digests[task_name]
+                num_grids += count
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(export_task_file, json_file, output_dir) for json_file in pending]
+                for future in as_completed(futures):
+                    task_name, count = future.result()
+                    exported[task_name] = digests[task_name]
+                    num_grids += count
+    finally:
+        save_manifest(output_dir, exported)
+    
+    elapsed = time.perf_counter() - start
+    return {
+        'tasks': len(json_files),
+        'exported_tasks': len(pending),
+        'skipped_tasks': len(json_files) - len(pending),
+        'grids': num_grids,
+        'seconds': elapsed,
+        'grids_per_second': num_grids / elapsed if elapsed > 0 else 0.0,
+    }
 
 def main():
     dataset_dir = 'ARC-AGI-2/data/evaluation'  # Path to the evaluation dataset
@@ -83,13 +317,12 @@ def main():
         print("Please make sure the ARC-AGI-2 repository is cloned in the current directory.")
         return
     
-    print(f"Loading tasks from {dataset_dir}")
-    tasks = load_all_arc_tasks(dataset_dir)
-    print(f"Found {len(tasks)} tasks")
-    
-    for task_name, task_data in tasks.items():
-        print(f"Processing task: {task_name}")
-        transform_task_to_images(task_data, output_dir, task_name)
+    print(f"Exporting tasks from {dataset_dir}")
+    stats = export_dataset(dataset_dir, output_dir)
+    print(f"Found {stats['tasks']} tasks: exported {stats['exported_tasks']}, "
+          f"skipped {stats['skipped_tasks']} unchanged")
+    print(f"Rendered {stats['grids']} grids in {stats['seconds']:.2f}s "
+          f"({stats['grids_per_second']:.0f} grids/s)")
     
     print(f"Images saved to {output_dir} directory")
 
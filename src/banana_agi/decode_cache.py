@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+
+from PIL import Image
+
+from banana_agi.decoding import DECODER_VERSION
+
+
+def image_digest(image) -> str:
+    """Content hash of a generated image.
+
+    Encoded bytes and files are hashed as stored, without decoding them; PIL
+    images are hashed by mode, size, pixels, palette, transparency and
+    recorded cell size.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    elif isinstance(image, (bytes, bytearray, memoryview)):
+        digest.update(image)
+    elif isinstance(image, Image.Image):
+        # getpalette loads the image, so read the palette mode after it
+        palette = bytes(image.getpalette(rawmode=None) or b"")
+        header = [
+            image.mode,
+            image.size,
+            image.info.get("cell_size"),
+            image.palette.mode if image.palette else None,
+            len(palette),
+            repr(image.info.get("transparency")),
+        ]
+        digest.update(json.dumps(header).encode())
+        digest.update(palette)
+        digest.update(image.tobytes())
+    else:
+        raise TypeError(f"Cannot hash image of type {type(image).__name__}")
+    return digest.hexdigest()
+
+
+class DecodeCache:
+    """Persistent cache of decoded grids keyed by image digest, decoder and target.
+
+    Entries live as small JSON files under cache_dir, fanned out by key
+    prefix, and are written atomically so concurrent runs can share a
+    directory. Keys include DECODER_VERSION and the decoder settings, so
+    results are only reused while decoding would reproduce them.
+    """
+
+    def __init__(self, cache_dir: str, version: int = DECODER_VERSION):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, digest: str, shape, settings) -> str:
+        """Cache key for an image digest, target (rows, cols) and decoder settings."""
+        fields = [self.version, digest, shape, settings]
+        encoded = json.dumps(fields, sort_keys=True).encode()
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> tuple[bool, list | None]:
+        """Return (found, grid); grid may be None when decoding gave nothing."""
+        try:
+            with open(self.path(key), "r") as f:
+                grid = json.load(f)["grid"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return False, None
+        with self._lock:
+            self.hits += 1
+        return True, grid
+
+    def put(self, key: str, grid):
+        """Store a decoded grid (a list of lists, or None)."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"grid": grid}, f)
+        os.replace(tmp_path, path)
+
+    def lookup(self, digest: str, shape, settings, decode):
+        """Return the cached grid for this key, calling decode() only on a miss."""
+        key = self.key(digest, shape, settings)
+        found, grid = self.get(key)
+        if not found:
+            grid = decode()
+            self.put(key, grid)
+        return grid
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
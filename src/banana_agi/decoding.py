@@ -0,0 +1,575 @@
+import functools
+import hashlib
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from banana_agi.dataset_loader import has_arc_palette
+from banana_agi.detection import (
+    detect_content_box,
+    detect_grid_dimensions,
+    strip_background_lines,
+)
+from banana_agi.palette import ARC_PALETTE, ARC_PALETTE_BYTES
+
+# Bits kept per RGB channel by the color lookup table: 6 bits is a 64^3 table
+LUT_BITS = 6
+# Lookup table entry for RGB bins whose colors are not all nearest the same entry
+AMBIGUOUS = 255
+# Directory where lookup tables are saved between runs, if set
+LUT_CACHE_DIR = os.environ.get("BANANA_AGI_LUT_CACHE_DIR")
+# Bump whenever a change alters decoded grids, invalidating DecodeCache entries
+DECODER_VERSION = 1
+# How image_to_grid reads each cell: its center pixel, a vote over all of its
+# pixels, or a vote over its interior only
+DECODE_STRATEGIES = ("center", "vote", "trimmed")
+# Fraction of the cell trimmed from each side by the "trimmed" strategy
+TRIMMED_MARGIN = 0.25
+# Fitting iterations and pixel sample size used by calibrate_palette
+CALIBRATION_ITERATIONS = 4
+CALIBRATION_SAMPLES = 5000
+# Clusters smaller than this share of the sample keep their ARC color
+MIN_CLUSTER_SHARE = 0.001
+# Cell scale factors and largest origin offset, as a fraction of a cell, tried
+# by align_cells, and where in each cell it samples colors
+ALIGNMENT_SCALES = (0.96, 0.98, 1.0, 1.02, 1.04)
+ALIGNMENT_OFFSET = 0.25
+ALIGNMENT_SAMPLES = (0.2, 0.5, 0.8)
+
+# Origin and cell size of a grid within an image, with the purity they score
+Alignment = namedtuple(
+    "Alignment", ["top", "left", "cell_height", "cell_width", "purity"]
+)
+
+
+def load_image(image):
+    """Open an image path or encoded image bytes, or pass a PIL image through."""
+    if isinstance(image, str):
+        return Image.open(image)
+    if isinstance(image, memoryview) and isinstance(image.obj, bytes):
+        if image.contiguous and image.nbytes == len(image.obj):
+            image = image.obj
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        # BytesIO shares an immutable bytes buffer instead of copying it
+        return Image.open(BytesIO(image))
+    return image
+
+
+def image_to_array(img: Image.Image) -> np.ndarray:
+    """Convert an image to an array once.
+
+    Palettized ARC renders give (H, W) grid values; anything else gives
+    (H, W, 3) RGB.
+    """
+    if has_arc_palette(img):
+        return np.asarray(img)
+    return np.asarray(img.convert("RGB"))
+
+
+def nearest_palette_colors(
+    colors: np.ndarray, palette: np.ndarray = ARC_PALETTE
+) -> np.ndarray:
+    """Map (..., 3) RGB colors to the index of the nearest palette color.
+
+    Ties resolve to the lowest index.
+    """
+    diff = colors[..., None, :].astype(np.int32) - palette.astype(np.int32)
+    distances = np.einsum("...k,...k->...", diff, diff)
+    return distances.argmin(axis=-1).astype(np.uint8)
+
+
+def color_confidence(
+    colors: np.ndarray, palette: np.ndarray = ARC_PALETTE
+) -> np.ndarray:
+    """How unambiguously (..., 3) RGB colors match their nearest palette color.
+
+    1 - sqrt(d1 / d2) for the nearest and second-nearest squared distances:
+    1 on an exact palette color, 0 halfway between two.
+    """
+    diff = colors[..., None, :].astype(np.int32) - palette.astype(np.int32)
+    distances = np.einsum("...k,...k->...", diff, diff)
+    nearest_two = np.partition(distances, 1, axis=-1)
+    return 1 - np.sqrt(nearest_two[..., 0] / nearest_two[..., 1])
+
+
+@functools.lru_cache(maxsize=None)
+def palette_lut(bits: int = LUT_BITS, cache_dir: str | None = None) -> np.ndarray:
+    """Lookup table mapping quantized RGB to the nearest ARC palette index.
+
+    The table has (2**bits)^3 uint8 entries, one per RGB bin. A bin whose
+    corners all share the same nearest palette color lies entirely inside that
+    color's (convex) Voronoi cell and stores its index. Bins straddling a
+    boundary store AMBIGUOUS. The table is built once per process and, when
+    cache_dir is given, saved there and reused across runs.
+    """
+    if not 1 <= bits <= 8:
+        raise ValueError("bits must be between 1 and 8")
+    palette_id = hashlib.blake2b(ARC_PALETTE_BYTES, digest_size=6).hexdigest()
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"arc_lut_{bits}bit_{palette_id}.npy")
+        if os.path.exists(path):
+            lut = np.load(path)
+            lut.flags.writeable = False
+            return lut
+
+    size = 1 << bits
+    step = 1 << (8 - bits)
+    # Lowest and highest channel value of every bin, interleaved
+    corners = np.stack([np.arange(size) * step, np.arange(size) * step + step - 1])
+    levels = corners.T.reshape(-1)
+    green, blue = np.meshgrid(levels, levels, indexing="ij")
+    nearest = np.empty((2 * size,) * 3, dtype=np.uint8)
+    # One red level at a time keeps the distance array small for 8-bit tables
+    for i, red in enumerate(levels):
+        colors = np.stack([np.full_like(green, red), green, blue], axis=-1)
+        nearest[i] = nearest_palette_colors(colors)
+
+    # Group the 2x2x2 corners of each bin and keep bins whose corners agree
+    by_bin = nearest.reshape(size, 2, size, 2, size, 2).transpose(0, 2, 4, 1, 3, 5)
+    by_bin = by_bin.reshape(size, size, size, 8)
+    lut = by_bin[..., 0].copy()
+    lut[(by_bin != by_bin[..., :1]).any(axis=-1)] = AMBIGUOUS
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, lut)
+        os.replace(tmp_path, path)
+    lut.flags.writeable = False
+    return lut
+
+
+def classify_colors(
+    colors: np.ndarray,
+    bits: int = LUT_BITS,
+    cache_dir: str | None = LUT_CACHE_DIR,
+    palette: np.ndarray | None = None,
+) -> np.ndarray:
+    """Map (..., 3) uint8 RGB colors to their nearest ARC palette indices.
+
+    A single table gather resolves almost every pixel; the few falling in bins
+    on a palette boundary are resolved exactly, so results always match
+    nearest_palette_colors. A calibrated palette is matched exactly instead.
+    """
+    colors = np.asarray(colors, dtype=np.uint8)
+    if palette is not None:
+        return nearest_palette_colors(colors, palette)
+    quantized = colors >> (8 - bits)
+    lut = palette_lut(bits, cache_dir)
+    classes = lut[quantized[..., 0], quantized[..., 1], quantized[..., 2]]
+    ambiguous = classes == AMBIGUOUS
+    if ambiguous.any():
+        classes[ambiguous] = nearest_palette_colors(colors[ambiguous])
+    return classes
+
+
+def nearest_labels(colors: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Index of the nearest center for each row of an (n, 3) float color array."""
+    diff = colors[:, None, :] - centers
+    return np.einsum("nkc,nkc->nk", diff, diff).argmin(axis=1)
+
+
+def calibrate_palette(
+    pixels: np.ndarray,
+    iterations: int = CALIBRATION_ITERATIONS,
+    max_samples: int = CALIBRATION_SAMPLES,
+) -> np.ndarray:
+    """Fit the ARC palette to the colors actually present in an RGB image.
+
+    Drift is first modeled as a per-channel gain and offset, refit by least
+    squares between each sampled pixel and its currently matched ARC color,
+    which handles global darkening, washing out and tints. A few k-means
+    iterations seeded with the result then adjust each color on its own;
+    clusters holding under MIN_CLUSTER_SHARE of the sample are left where the
+    global fit put them. Cluster i stays palette id i. Returns a (10, 3)
+    uint8 palette for the palette arguments of the decoders.
+    """
+    colors = pixels.reshape(-1, 3)
+    colors = colors[:: max(1, len(colors) // max_samples)].astype(np.float64)
+    seeds = ARC_PALETTE.astype(np.float64)
+    gain, offset = np.ones(3), np.zeros(3)
+    for _ in range(iterations):
+        matched = seeds[nearest_labels(colors, seeds * gain + offset)]
+        matched_mean, color_mean = matched.mean(axis=0), colors.mean(axis=0)
+        variance = ((matched - matched_mean) ** 2).mean(axis=0)
+        covariance = ((matched - matched_mean) * (colors - color_mean)).mean(axis=0)
+        # Channels with a single matched value keep a unit gain
+        gain = np.where(variance > 0, covariance / np.maximum(variance, 1e-9), 1.0)
+        offset = color_mean - gain * matched_mean
+
+    centers = seeds * gain + offset
+    for _ in range(iterations):
+        labels = nearest_labels(colors, centers)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=colors[:, c], minlength=len(centers))
+                for c in range(3)
+            ],
+            axis=1,
+        )
+        populated = counts >= MIN_CLUSTER_SHARE * len(colors)
+        centers = np.where(
+            populated[:, None], sums / np.maximum(counts, 1)[:, None], centers
+        )
+    return np.clip(centers, 0, 255).round().astype(np.uint8)
+
+
+def cell_centers(length: int, count: int, cell_length: float) -> np.ndarray:
+    """Pixel coordinate of the center of each of count cells along one axis."""
+    centers = (np.arange(count) * cell_length + cell_length / 2).astype(np.intp)
+    return np.minimum(centers, length - 1)
+
+
+def decode_cells(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    cell_height: float,
+    cell_width: float,
+    return_confidence: bool = False,
+    palette: np.ndarray | None = None,
+):
+    """Decode an image array into a (rows, cols) grid from the cell-center pixels.
+
+    With return_confidence, also return each center's color_confidence.
+    palette replaces the ARC colors, e.g. with calibrate_palette's.
+    """
+    ys = cell_centers(pixels.shape[0], rows, cell_height)
+    xs = cell_centers(pixels.shape[1], cols, cell_width)
+    samples = pixels[ys[:, None], xs[None, :]]
+    if samples.ndim == 2:
+        # Palette indices are grid values already
+        grid = samples
+        confidence = np.ones(samples.shape)
+    else:
+        grid = classify_colors(samples, palette=palette)
+        if return_confidence:
+            reference = ARC_PALETTE if palette is None else palette
+            confidence = color_confidence(samples, reference)
+    if return_confidence:
+        return grid, confidence
+    return grid
+
+
+def block_indices(
+    length: int, count: int, cell_length: float, margin: float = 0.0
+) -> np.ndarray:
+    """(count, k) pixel coordinates of every cell along one axis.
+
+    margin is the fraction of the cell dropped from each side; at least one
+    pixel per cell is always kept.
+    """
+    size = max(int(cell_length), 1)
+    trim = min(int(size * margin), (size - 1) // 2)
+    starts = (np.arange(count) * cell_length).astype(np.intp)
+    indices = starts[:, None] + np.arange(trim, size - trim)
+    return np.minimum(indices, length - 1)
+
+
+def cell_blocks(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    cell_height: float,
+    cell_width: float,
+    margin: float = 0.0,
+) -> np.ndarray:
+    """Gather the pixels of every cell into a (rows, cell_h, cols, cell_w[, 3]) array.
+
+    Whole-pixel cells are a reshaped view of the image; fractional cells are
+    gathered with index arrays.
+    """
+    ys = block_indices(pixels.shape[0], rows, cell_height, margin)
+    xs = block_indices(pixels.shape[1], cols, cell_width, margin)
+    height, width = int(cell_height), int(cell_width)
+    if (
+        height == cell_height
+        and width == cell_width
+        and rows * height <= pixels.shape[0]
+        and cols * width <= pixels.shape[1]
+    ):
+        blocks = pixels[: rows * height, : cols * width].reshape(
+            rows, height, cols, width, *pixels.shape[2:]
+        )
+        # The first cell starts at 0, so its indices give the trimmed window
+        return blocks[:, ys[0, 0] : ys[0, -1] + 1, :, xs[0, 0] : xs[0, -1] + 1]
+    return pixels[ys[:, :, None, None], xs[None, None, :, :]]
+
+
+def cell_votes(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    cell_height: float,
+    cell_width: float,
+    margin: float = 0.0,
+    palette: np.ndarray | None = None,
+) -> np.ndarray:
+    """Count the pixels of each ARC color in every cell, as (rows, cols, 10)."""
+    blocks = cell_blocks(pixels, rows, cols, cell_height, cell_width, margin)
+    if blocks.ndim == 5:
+        blocks = classify_colors(blocks, palette=palette)
+    # Offset each cell's classes so one bincount tallies every cell at once
+    colors = len(ARC_PALETTE)
+    cell_ids = np.arange(rows)[:, None, None, None] * cols + np.arange(cols)[:, None]
+    counts = np.bincount(
+        (cell_ids * colors + blocks).ravel(), minlength=rows * cols * colors
+    )
+    return counts.reshape(rows, cols, colors)
+
+
+def vote_cells(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    cell_height: float,
+    cell_width: float,
+    margin: float = 0.0,
+    return_confidence: bool = False,
+    palette: np.ndarray | None = None,
+):
+    """Decode a (rows, cols) grid by majority vote over each cell's pixels.
+
+    Ties resolve to the lowest color. With return_confidence, also return each
+    cell's vote purity, the winning color's share of its votes.
+    """
+    votes = cell_votes(pixels, rows, cols, cell_height, cell_width, margin, palette)
+    grid = votes.argmax(axis=-1).astype(np.uint8)
+    if return_confidence:
+        return grid, votes.max(axis=-1) / votes.sum(axis=-1)
+    return grid
+
+
+def decode_grid(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    cell_height: float,
+    cell_width: float,
+    strategy: str = "center",
+    margin: float | None = None,
+    return_confidence: bool = False,
+    palette: np.ndarray | None = None,
+):
+    """Decode an image array into a (rows, cols) grid with one of DECODE_STRATEGIES.
+
+    margin overrides the fraction of each cell border ignored by the vote.
+    With return_confidence, a (rows, cols) array of per-cell confidences in
+    [0, 1] is returned too: the color match margin of each center, or the
+    vote purity of each cell. palette optionally replaces the ARC colors.
+    """
+    if strategy not in DECODE_STRATEGIES:
+        raise ValueError(f"Unknown decode strategy: {strategy}")
+    if strategy == "center":
+        return decode_cells(
+            pixels, rows, cols, cell_height, cell_width, return_confidence, palette
+        )
+    if margin is None:
+        margin = TRIMMED_MARGIN if strategy == "trimmed" else 0.0
+    return vote_cells(
+        pixels,
+        rows,
+        cols,
+        cell_height,
+        cell_width,
+        margin,
+        return_confidence,
+        palette,
+    )
+
+
+def decode_images(
+    images: list,
+    shapes: list,
+    strategy: str = "center",
+    margin: float | None = None,
+    workers: int | None = None,
+    crop: bool = False,
+    calibrate: bool = False,
+    align: bool = False,
+) -> list:
+    """Decode many images into grids, returned in input order.
+
+    images are paths, encoded bytes or PIL images; shapes holds the
+    (rows, cols) expected for each, or None to take it from the cell size
+    recorded in the image metadata or else detect it. Images are
+    decompressed on a thread pool, which PIL runs without the GIL, and the
+    center strategy classifies every image's cell colors in one stacked
+    lookup. With crop, padding around each grid is trimmed first; with
+    calibrate, each image is matched against its own calibrate_palette; with
+    align, cells are sampled at the origin and size found by align_cells.
+    Missing images decode to None.
+    """
+    if strategy not in DECODE_STRATEGIES:
+        raise ValueError(f"Unknown decode strategy: {strategy}")
+
+    def load(image, shape):
+        if image is None:
+            return None, shape
+        img = load_image(image)
+        pixels = image_to_array(img)
+        cell_size = img.info.get("cell_size") if shape is None else None
+        if crop:
+            box = detect_content_box(pixels)
+            if shape is None and cell_size is None:
+                return strip_background_lines(pixels, box), shape
+            pixels = pixels[box.top : box.bottom, box.left : box.right]
+        if cell_size is not None:
+            # Whole cells of the recorded size, as image_to_grid decodes them
+            cell_size = int(cell_size)
+            height, width = pixels.shape[:2]
+            shape = (
+                max(1, round(height / cell_size)),
+                max(1, round(width / cell_size)),
+            )
+        return pixels, shape
+
+    def cells(pixels, shape):
+        if pixels is None:
+            return None
+        rows, cols = shape or detect_grid_dimensions(pixels)[:2]
+        cell_height = pixels.shape[0] / rows
+        cell_width = pixels.shape[1] / cols
+        palette = None
+        if calibrate and pixels.ndim == 3:
+            palette = calibrate_palette(pixels)
+        if align:
+            alignment = align_cells(pixels, rows, cols, palette)
+            pixels = aligned_pixels(pixels, alignment)
+            cell_height, cell_width = alignment.cell_height, alignment.cell_width
+        if strategy != "center" or palette is not None:
+            return decode_grid(
+                pixels,
+                rows,
+                cols,
+                cell_height,
+                cell_width,
+                strategy,
+                margin,
+                palette=palette,
+            )
+        ys = cell_centers(pixels.shape[0], rows, cell_height)
+        xs = cell_centers(pixels.shape[1], cols, cell_width)
+        return pixels[ys[:, None], xs[None, :]]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        loaded = list(pool.map(load, images, shapes))
+        arrays = [pixels for pixels, _ in loaded]
+        shapes = [shape for _, shape in loaded]
+        decoded = list(pool.map(cells, arrays, shapes))
+
+    if strategy == "center":
+        # Classify the remaining RGB cell centers of every image in one lookup
+        rgb = [
+            i
+            for i, samples in enumerate(decoded)
+            if samples is not None and samples.ndim == 3
+        ]
+        if rgb:
+            stacked = np.concatenate([decoded[i].reshape(-1, 3) for i in rgb])
+            classes = classify_colors(stacked)
+            offsets = np.cumsum(
+                [decoded[i].shape[0] * decoded[i].shape[1] for i in rgb]
+            )
+            for i, flat in zip(rgb, np.split(classes, offsets[:-1])):
+                decoded[i] = flat.reshape(decoded[i].shape[:2])
+    return [None if grid is None else grid.tolist() for grid in decoded]
+
+
+def axis_candidates(
+    count: int, cell_length: float, scales=ALIGNMENT_SCALES
+) -> tuple[np.ndarray, np.ndarray]:
+    """(origins, cell lengths) of the alignments tried along one axis.
+
+    Candidates are ordered by how far they stray from the nominal alignment,
+    so ties in purity resolve to the least adjusted one.
+    """
+    reach = max(1, int(cell_length * ALIGNMENT_OFFSET))
+    origins, lengths = np.meshgrid(
+        np.arange(-reach, reach + 1), cell_length * np.array(scales), indexing="ij"
+    )
+    origins, lengths = origins.ravel(), lengths.ravel()
+    drift = np.abs(origins) / cell_length + np.abs(lengths / cell_length - 1) * count
+    order = np.argsort(drift, kind="stable")
+    return origins[order].astype(np.float64), lengths[order]
+
+
+def sample_positions(
+    origins: np.ndarray, lengths: np.ndarray, count: int, size: int
+) -> np.ndarray:
+    """(candidates, count, k) pixel coordinates sampled inside every cell."""
+    fractions = np.arange(count)[:, None] + np.array(ALIGNMENT_SAMPLES)
+    positions = origins[:, None, None] + fractions * lengths[:, None, None]
+    return np.clip(positions.astype(np.intp), 0, size - 1)
+
+
+def cell_purity(classes: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """Mean within-cell agreement of the sampled classes for each candidate.
+
+    ys is (candidates, rows, k) and xs (candidates, cols, k); either may have
+    a single candidate that is shared by all.
+    """
+    samples = classes[ys[:, :, :, None, None], xs[:, None, None, :, :]]
+    candidates, rows, cols = samples.shape[0], samples.shape[1], samples.shape[3]
+    # Tally every (candidate, cell, color) with a single bincount
+    colors = len(ARC_PALETTE)
+    cell_ids = np.arange(candidates * rows * cols).reshape(candidates, rows, 1, cols, 1)
+    counts = np.bincount(
+        (cell_ids * colors + samples).ravel(),
+        minlength=candidates * rows * cols * colors,
+    ).reshape(candidates, rows * cols, colors)
+    return (counts.max(axis=-1) / (ys.shape[2] * xs.shape[2])).mean(axis=1)
+
+
+def align_cells(
+    pixels: np.ndarray,
+    rows: int,
+    cols: int,
+    palette: np.ndarray | None = None,
+    scales=ALIGNMENT_SCALES,
+) -> Alignment:
+    """Find the grid origin and cell size that make cells most uniform in color.
+
+    The nominal alignment divides the image evenly into rows x cols cells.
+    Origins within ALIGNMENT_OFFSET of a cell and the given scale factors are
+    tried, the rows axis first with columns nominal, then the columns axis
+    at the best rows alignment. Each axis scores all its candidates in one
+    batch by how well the colors sampled inside every cell agree.
+    """
+    height, width = pixels.shape[:2]
+    classes = pixels if pixels.ndim == 2 else classify_colors(pixels, palette=palette)
+    y_origins, y_lengths = axis_candidates(rows, height / rows, scales)
+    x_origins, x_lengths = axis_candidates(cols, width / cols, scales)
+
+    xs = sample_positions(x_origins[:1], x_lengths[:1], cols, width)
+    ys = sample_positions(y_origins, y_lengths, rows, height)
+    best_y = int(cell_purity(classes, ys, xs).argmax())
+    ys = ys[best_y : best_y + 1]
+    xs = sample_positions(x_origins, x_lengths, cols, width)
+    purity = cell_purity(classes, ys, xs)
+    best_x = int(purity.argmax())
+    return Alignment(
+        float(y_origins[best_y]),
+        float(x_origins[best_x]),
+        float(y_lengths[best_y]),
+        float(x_lengths[best_x]),
+        float(purity[best_x]),
+    )
+
+
+def aligned_pixels(pixels: np.ndarray, alignment: Alignment) -> np.ndarray:
+    """Shift pixels so the aligned grid starts at the top-left corner.
+
+    Origins before the image edge are filled by repeating the edge pixels.
+    """
+    top, left = int(alignment.top), int(alignment.left)
+    pad = [(max(-top, 0), 0), (max(-left, 0), 0)] + [(0, 0)] * (pixels.ndim - 2)
+    if top < 0 or left < 0:
+        pixels = np.pad(pixels, pad, mode="edge")
+    return pixels[max(top, 0) :, max(left, 0) :]
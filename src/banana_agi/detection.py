@@ -0,0 +1,356 @@
+from collections import namedtuple
+
+import numpy as np
+
+from banana_agi.palette import ARC_PALETTE
+
+# ARC grids are at most 30x30
+MAX_GRID_SIDE = 30
+# Pixels either side of an expected cell boundary that still count as on it
+BOUNDARY_TOLERANCE = 1
+
+# Largest per-channel difference from the background still counted as background
+BACKGROUND_TOLERANCE = 40
+# Share of a pixel line that must differ from the background to count as content
+MIN_CONTENT_FRACTION = 0.02
+# Share of the image border a color must cover to be taken as the background
+MIN_BACKGROUND_SHARE = 0.5
+# Background runs narrower than this do not separate two panels
+MIN_PANEL_GAP = 3
+# Panels must be at least this many pixels on each side and mostly content,
+# which rules out labels, arrows and stray marks
+MIN_PANEL_SIDE = 12
+MIN_PANEL_FILL = 0.8
+# Background lines up to this share of a cell's side are gridlines inside one
+# grid, so single-color pieces closer than that are cells of the same panel
+MAX_GRIDLINE_SHARE = 0.5
+
+GridDimensions = namedtuple("GridDimensions", ["rows", "cols", "confidence"])
+# Content spans rows top:bottom and columns left:right; background is the
+# RGB color around it, or None when nothing was cropped
+ContentBox = namedtuple("ContentBox", ["top", "bottom", "left", "right", "background"])
+
+
+def transition_profiles(pixels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Amount of color change between neighboring rows and between neighboring columns.
+
+    Returns (row_profile, col_profile) of lengths height - 1 and width - 1;
+    entry i measures the change between pixel lines i and i + 1.
+    """
+    values = pixels.astype(np.int16)
+    if values.ndim == 2:
+        # Palette indices: count changed cells rather than index distance
+        row_profile = (values[1:] != values[:-1]).sum(axis=1)
+        col_profile = (values[:, 1:] != values[:, :-1]).sum(axis=0)
+    else:
+        row_profile = np.abs(values[1:] - values[:-1]).sum(axis=(1, 2))
+        col_profile = np.abs(values[:, 1:] - values[:, :-1]).sum(axis=(0, 2))
+    return row_profile.astype(np.float64), col_profile.astype(np.float64)
+
+
+def boundary_masks(length: int, max_count: int = MAX_GRID_SIDE) -> np.ndarray:
+    """(max_count, length - 1) masks of the profile entries on each count's boundaries.
+
+    Row n - 1 marks the boundaries between n equal cells spanning length pixels.
+    """
+    positions = length - 1
+    masks = np.zeros((max_count, max(positions, 0)), dtype=bool)
+    counts = np.arange(2, max_count + 1)
+    # One entry per inner boundary of every candidate count
+    per_count = counts - 1
+    candidate = np.repeat(counts, per_count)
+    k = np.arange(per_count.sum()) - np.repeat(
+        np.cumsum(per_count) - per_count, per_count
+    )
+    centers = np.rint((k + 1) * length / candidate).astype(np.intp) - 1
+    for offset in range(-BOUNDARY_TOLERANCE, BOUNDARY_TOLERANCE + 1):
+        index = centers + offset
+        valid = (index >= 0) & (index < positions)
+        masks[candidate[valid] - 1, index[valid]] = True
+    return masks
+
+
+def detect_count(
+    profile: np.ndarray, max_count: int = MAX_GRID_SIDE
+) -> tuple[int, float]:
+    """Infer how many equal cells produced a transition profile.
+
+    Each candidate count is scored by the share of all color change that falls
+    on its boundaries minus the share of positions those boundaries cover, so
+    divisors of the true count lose the change they miss and multiples pay
+    for the positions they add. Returns (count, score); the score is in
+    [0, 1], highest for crisp renders with large cells.
+    """
+    total = profile.sum()
+    max_count = min(max_count, len(profile) + 1)
+    if total == 0 or max_count < 2:
+        return 1, 0.0
+    masks = boundary_masks(len(profile) + 1, max_count)
+    explained = masks @ profile / total
+    coverage = masks.mean(axis=1)
+    scores = explained - coverage
+    # Ties go to the smallest count
+    best = int(scores.argmax())
+    return best + 1, float(max(scores[best], 0.0))
+
+
+def detect_grid_dimensions(
+    pixels: np.ndarray, max_side: int = MAX_GRID_SIDE
+) -> GridDimensions:
+    """Infer the rows and columns of a grid image that fills the whole array.
+
+    The confidence is the weaker of the two axes' scores.
+    """
+    row_profile, col_profile = transition_profiles(pixels)
+    rows, row_score = detect_count(row_profile, max_side)
+    cols, col_score = detect_count(col_profile, max_side)
+    return GridDimensions(rows, cols, min(row_score, col_score))
+
+
+def border_background(
+    pixels: np.ndarray, min_share: float = MIN_BACKGROUND_SHARE
+) -> np.ndarray | None:
+    """Dominant RGB color of an image's outermost pixels, or None if none dominates.
+
+    Colors are binned to 16 levels per channel so noise and compression do not
+    split the background; the mean color of the winning bin is returned.
+    """
+    border = np.concatenate(
+        [pixels[0], pixels[-1], pixels[1:-1, 0], pixels[1:-1, -1]]
+    ).astype(np.int32)
+    bins = border >> 4
+    keys = (bins[:, 0] << 8) | (bins[:, 1] << 4) | bins[:, 2]
+    values, counts = np.unique(keys, return_counts=True)
+    best = counts.argmax()
+    if counts[best] < min_share * len(keys):
+        return None
+    return border[keys == values[best]].mean(axis=0).round().astype(np.uint8)
+
+
+def usable_background(
+    pixels: np.ndarray,
+    background: np.ndarray | None,
+    tolerance: int,
+    allow_palette_background: bool,
+) -> np.ndarray | None:
+    """The background to separate content from, as int16 RGB, or None if unusable.
+
+    Defaults to border_background. ARC grids often have edges of a single
+    color, black most of all, which look just like padding, so backgrounds
+    matching an ARC color are rejected unless allow_palette_background.
+    """
+    if background is None:
+        background = border_background(pixels)
+        if background is None:
+            return None
+    background = np.asarray(background, dtype=np.int16)
+    if not allow_palette_background:
+        palette_distance = np.abs(ARC_PALETTE.astype(np.int16) - background).max(axis=1)
+        if palette_distance.min() <= tolerance:
+            return None
+    return background
+
+
+def detect_content_box(
+    pixels: np.ndarray,
+    background: np.ndarray | None = None,
+    tolerance: int = BACKGROUND_TOLERANCE,
+    allow_palette_background: bool = False,
+) -> ContentBox:
+    """Find the region of an RGB image that differs from its background.
+
+    Leading and trailing rows and columns where under MIN_CONTENT_FRACTION of
+    pixels differ from the usable_background are cropped. Palette-index
+    arrays, uniform images and images without a usable background are not
+    cropped.
+    """
+    height, width = pixels.shape[:2]
+    full = ContentBox(0, height, 0, width, None)
+    if pixels.ndim == 2:
+        return full
+    background = usable_background(
+        pixels, background, tolerance, allow_palette_background
+    )
+    if background is None:
+        return full
+
+    content = (np.abs(pixels.astype(np.int16) - background) > tolerance).any(axis=-1)
+    rows = np.flatnonzero(content.mean(axis=1) > MIN_CONTENT_FRACTION)
+    cols = np.flatnonzero(content.mean(axis=0) > MIN_CONTENT_FRACTION)
+    if len(rows) == 0 or len(cols) == 0:
+        return full
+    return ContentBox(
+        int(rows[0]),
+        int(rows[-1]) + 1,
+        int(cols[0]),
+        int(cols[-1]) + 1,
+        tuple(int(c) for c in background),
+    )
+
+
+def crop_to_content(pixels: np.ndarray, **kwargs) -> np.ndarray:
+    """View of pixels restricted to detect_content_box; kwargs are passed through."""
+    box = detect_content_box(pixels, **kwargs)
+    return pixels[box.top : box.bottom, box.left : box.right]
+
+
+def strip_background_lines(
+    pixels: np.ndarray, box: ContentBox, tolerance: int = BACKGROUND_TOLERANCE
+) -> np.ndarray:
+    """Crop pixels to box, dropping the rows and columns inside that are all background.
+
+    Background-colored gridlines between cells would otherwise count as
+    cells of their own when detecting grid dimensions. Lines are only dropped
+    when the background frames the box on every side; otherwise it may be a
+    drifted cell color, and the plain crop is returned.
+    """
+    height, width = pixels.shape[:2]
+    pixels = pixels[box.top : box.bottom, box.left : box.right]
+    framed = 0 < box.top and box.bottom < height and 0 < box.left and box.right < width
+    if box.background is None or not framed:
+        return pixels
+    distance = np.abs(pixels.astype(np.int16) - np.asarray(box.background, np.int16))
+    content = (distance > tolerance).any(axis=-1)
+    rows = content.mean(axis=1) > MIN_CONTENT_FRACTION
+    cols = content.mean(axis=0) > MIN_CONTENT_FRACTION
+    return pixels[rows][:, cols]
+
+
+def content_runs(profile: np.ndarray, min_gap: int = MIN_PANEL_GAP) -> list:
+    """(start, stop) runs of True in profile, bridging gaps under min_gap."""
+    padded = np.concatenate([[False], profile, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = []
+    for start, stop in zip(edges[::2], edges[1::2]):
+        if runs and start - runs[-1][1] < min_gap:
+            runs[-1] = (runs[-1][0], int(stop))
+        else:
+            runs.append((int(start), int(stop)))
+    return runs
+
+
+def split_regions(content: np.ndarray, top: int = 0, left: int = 0) -> list:
+    """Split a content mask into rectangles separated by background bands.
+
+    Recursive XY cut: the mask is split on background rows, each band on
+    background columns, and every piece again until none splits further.
+    Returns (top, bottom, left, right) boxes in reading order.
+    """
+    rows = content_runs(content.mean(axis=1) > MIN_CONTENT_FRACTION)
+    boxes = []
+    for row_start, row_stop in rows:
+        band = content[row_start:row_stop]
+        cols = content_runs(band.mean(axis=0) > MIN_CONTENT_FRACTION)
+        for col_start, col_stop in cols:
+            piece = band[:, col_start:col_stop]
+            box = (
+                top + row_start,
+                top + row_stop,
+                left + col_start,
+                left + col_stop,
+            )
+            if len(rows) == 1 and len(cols) == 1:
+                # Neither axis splits: trim to the content and stop
+                boxes.append(box)
+            else:
+                boxes.extend(split_regions(piece, box[0], box[2]))
+    return boxes
+
+
+def is_cell(pixels: np.ndarray, content: np.ndarray, box, tolerance: int) -> bool:
+    """Whether a box is one square, single-color block of content, like a grid cell."""
+    top, bottom, left, right = box
+    side, length = sorted((bottom - top, right - left))
+    if side < MIN_PANEL_GAP or length > 2 * side:
+        return False
+    if content[top:bottom, left:right].mean() < MIN_PANEL_FILL:
+        return False
+    colors = pixels[top:bottom, left:right].reshape(-1, 3).astype(np.int16)
+    median = np.median(colors, axis=0)
+    matching = (np.abs(colors - median) <= tolerance).all(axis=1)
+    return matching.mean() >= MIN_PANEL_FILL
+
+
+def merge_cells(boxes: list, cells: list) -> list:
+    """Merge boxes flagged in cells that are only gridlines apart into lattices.
+
+    Two cells join when the background between them is at most
+    MAX_GRIDLINE_SHARE of the smaller cell's side. Other boxes are kept as
+    they are; each merged lattice takes the place of its first cell.
+    """
+    index = np.flatnonzero(cells)
+    if len(index) < 2:
+        return boxes
+    cell_boxes = np.array([boxes[i] for i in index])
+    top, bottom, left, right = cell_boxes.T
+    # Background lines between each pair of cells, negative where they overlap
+    gap = np.maximum(
+        np.maximum(top[:, None] - bottom[None, :], top[None, :] - bottom[:, None]),
+        np.maximum(left[:, None] - right[None, :], left[None, :] - right[:, None]),
+    )
+    side = np.minimum(bottom - top, right - left)
+    adjacent = gap <= MAX_GRIDLINE_SHARE * np.minimum(side[:, None], side[None, :])
+
+    labels = np.arange(len(index))
+    while True:
+        # Spread the smallest label through each connected group of cells
+        spread = np.where(adjacent, labels[None, :], len(index)).min(axis=1)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    merged = list(boxes)
+    for label in np.unique(labels):
+        members = index[labels == label]
+        group = cell_boxes[labels == label]
+        merged[members[0]] = (
+            int(group[:, 0].min()),
+            int(group[:, 1].max()),
+            int(group[:, 2].min()),
+            int(group[:, 3].max()),
+        )
+        for member in members[1:]:
+            merged[member] = None
+    return [box for box in merged if box is not None]
+
+
+def detect_panels(
+    pixels: np.ndarray,
+    background: np.ndarray | None = None,
+    tolerance: int = BACKGROUND_TOLERANCE,
+    allow_palette_background: bool = False,
+) -> list:
+    """Find the separate grid panels of an RGB image, in reading order.
+
+    Pixels differing from the usable_background are content; the content is
+    split into rectangles separated by background bands at least
+    MIN_PANEL_GAP wide. Single-color cells only gridlines apart are merged
+    back into one grid, and rectangles at least MIN_PANEL_SIDE on each side
+    and MIN_PANEL_FILL content are kept. Returns ContentBox tuples; an image
+    without a usable background is a single panel.
+    """
+    height, width = pixels.shape[:2]
+    full = [ContentBox(0, height, 0, width, None)]
+    if pixels.ndim == 2:
+        return full
+    background = usable_background(
+        pixels, background, tolerance, allow_palette_background
+    )
+    if background is None:
+        return full
+
+    content = (np.abs(pixels.astype(np.int16) - background) > tolerance).any(axis=-1)
+    color = tuple(int(c) for c in background)
+    boxes = split_regions(content)
+    cells = [is_cell(pixels, content, box, tolerance) for box in boxes]
+    merged = merge_cells(boxes, cells)
+    lattices = set(merged) - set(boxes)
+    panels = []
+    for top, bottom, left, right in merged:
+        if min(bottom - top, right - left) < MIN_PANEL_SIDE:
+            continue
+        # Lattices include their gridlines, so only plain panels must be filled
+        fill = content[top:bottom, left:right].mean()
+        if (top, bottom, left, right) not in lattices and fill < MIN_PANEL_FILL:
+            continue
+        panels.append(ContentBox(top, bottom, left, right, color))
+    return panels or full
@@ -0,0 +1,29 @@
+import numpy as np
+
+# ARC color palette, indexed by grid value
+ARC_COLORS = [
+    (0, 0, 0),        # 0: black
+    (0, 116, 217),    # 1: blue
+    (255, 65, 54),    # 2: red
+    (46, 204, 64),    # 3: green
+    (255, 220, 0),    # 4: yellow
+    (170, 170, 170),  # 5: gray
+    (240, 18, 190),   # 6: magenta
+    (255, 133, 27),   # 7: orange
+    (127, 219, 255),  # 8: sky blue
+    (135, 12, 37),    # 9: maroon
+]
+ARC_PALETTE = np.array(ARC_COLORS, dtype=np.uint8)
+# Flat RGB palette of the ARC colors alone
+ARC_PALETTE_BYTES = ARC_PALETTE.tobytes()
+
+# Extra entries used by styled renders, after the ten ARC colors
+GRIDLINE_INDEX = 10
+BACKGROUND_INDEX = 11
+STYLE_COLORS = [
+    (85, 85, 85),     # 10: gridlines and frame
+    (255, 255, 255),  # 11: cell padding
+]
+RENDER_PALETTE = np.array(ARC_COLORS + STYLE_COLORS, dtype=np.uint8)
+# Flat RGB palette attached to every palettized ("P" mode) render
+RENDER_PALETTE_BYTES = RENDER_PALETTE.tobytes()
@@ -0,0 +1,93 @@
+import struct
+import zlib
+
+import numpy as np
+
+from banana_agi.palette import RENDER_PALETTE, RENDER_PALETTE_BYTES
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG scanline filter types usable by encode_png
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2}
+
+# Rendered grids are flat-color blocks: "up" turns every repeated pixel row of a
+# cell into zeros, which zlib compresses to almost nothing.
+DEFAULT_FILTER = "up"
+DEFAULT_LEVEL = 6
+
+
+def _chunk(tag: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data))
+    )
+
+
+def encode_png(
+    pixels: np.ndarray,
+    level: int = DEFAULT_LEVEL,
+    filter_type: str = DEFAULT_FILTER,
+    metadata: dict | None = None,
+) -> bytes:
+    """Encode rendered pixels straight to PNG bytes.
+
+    pixels is either an (H, W, 3) uint8 RGB array or an (H, W) array of render
+    palette indices; index images are written as 4-bit palettized PNGs with the
+    render palette. level is the zlib compression level (0-9) and filter_type one
+    of PNG_FILTERS, applied to every scanline. metadata entries are stored as
+    tEXt chunks, which PIL exposes through Image.info.
+    """
+    if filter_type not in PNG_FILTERS:
+        raise ValueError(f"Unsupported PNG filter: {filter_type}")
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    height, width = pixels.shape[:2]
+
+    if pixels.ndim == 3:
+        color_type, bit_depth, bytes_per_pixel = 2, 8, 3
+        scanlines = pixels.reshape(height, width * 3)
+        palette = b""
+    elif pixels.ndim == 2:
+        if pixels.size and pixels.max() >= len(RENDER_PALETTE):
+            raise ValueError("Palette indices must be valid render palette entries")
+        # The render palette fits in 4 bits: pack two pixels per byte
+        color_type, bit_depth, bytes_per_pixel = 3, 4, 1
+        if width % 2:
+            pixels = np.pad(pixels, ((0, 0), (0, 1)))
+        scanlines = (pixels[:, 0::2] << 4) | pixels[:, 1::2]
+        palette = _chunk(b"PLTE", RENDER_PALETTE_BYTES)
+    else:
+        raise ValueError(f"Expected (H, W) or (H, W, 3) pixels, got {pixels.shape}")
+
+    filtered = np.empty((height, scanlines.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = PNG_FILTERS[filter_type]
+    body = filtered[:, 1:]
+    if filter_type == "sub":
+        body[:, :bytes_per_pixel] = scanlines[:, :bytes_per_pixel]
+        np.subtract(
+            scanlines[:, bytes_per_pixel:],
+            scanlines[:, :-bytes_per_pixel],
+            out=body[:, bytes_per_pixel:],
+        )
+    elif filter_type == "up":
+        body[:1] = scanlines[:1]
+        np.subtract(scanlines[1:], scanlines[:-1], out=body[1:])
+    else:
+        body[...] = scanlines
+
+    text = [
+        _chunk(b"tEXt", f"{key}\0{value}".encode("latin-1"))
+        for key, value in (metadata or {}).items()
+    ]
+    header = struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+    return b"".join(
+        [
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", header),
+            palette,
+            *text,
+            _chunk(b"IDAT", zlib.compress(filtered.tobytes(), level)),
+            _chunk(b"IEND", b""),
+        ]
+    )
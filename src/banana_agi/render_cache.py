@@ -0,0 +1,153 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from banana_agi.dataset_loader import grid_to_pixels, pixels_to_image
+from banana_agi.png_encoder import DEFAULT_FILTER, DEFAULT_LEVEL, encode_png
+
+
+def grid_digest(grid) -> str:
+    """Content hash of a grid: identical values and shape give identical digests."""
+    cells = np.ascontiguousarray(grid, dtype=np.uint8)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array(cells.shape, dtype=np.int64).tobytes())
+    digest.update(cells.tobytes())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered grids keyed by (grid digest, cell_size, mode, style).
+
+    Holds PIL images (render), read-only pixel arrays (pixels) and encoded PNG
+    bytes (png). Cached images are shared between callers and must not be
+    modified in place. When a SharedRenderCache is given, rendered pixels are
+    looked up in and published to it, so worker processes on the same host
+    render each grid once.
+    """
+
+    def __init__(self, maxsize: int = 1024, shared=None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, grid, cell_size: int = 20, mode: str = "RGB", style=None):
+        """Return the rendered image for a grid, rendering it only on a cache miss."""
+        digest = grid_digest(grid)
+
+        def create(pixels):
+            if self.shared is not None:
+                # Copy out of shared memory: "P" images wrap the buffer they are
+                # built from and would outlive the pinned entry
+                pixels = np.array(pixels)
+            return pixels_to_image(pixels)
+
+        return self._lookup(
+            ("image", digest, cell_size, mode, style),
+            lambda: self._with_pixels(grid, digest, cell_size, mode, style, create),
+        )
+
+    def pixels(self, grid, cell_size: int = 20, mode: str = "RGB", style=None):
+        """Return rendered pixels as a read-only uint8 array, rendering only on a miss.
+
+        Skips the PIL image entirely for callers that want arrays, such as plots.
+        """
+        digest = grid_digest(grid)
+
+        def create():
+            if self.shared is None:
+                pixels = grid_to_pixels(grid, cell_size, mode, style)
+            else:
+                # Copy out of shared memory: the entry may be evicted later
+                pixels = self._with_pixels(
+                    grid, digest, cell_size, mode, style, np.array
+                )
+            pixels.flags.writeable = False
+            return pixels
+
+        return self._lookup(("pixels", digest, cell_size, mode, style), create)
+
+    def png(
+        self,
+        grid,
+        cell_size: int = 20,
+        mode: str = "P",
+        level: int = DEFAULT_LEVEL,
+        filter_type: str = DEFAULT_FILTER,
+        style=None,
+    ) -> bytes:
+        """Return PNG bytes for a grid, encoding it only on a cache miss.
+
+        The cell size is recorded in the PNG metadata for image_to_grid.
+        """
+        digest = grid_digest(grid)
+
+        def encode(pixels):
+            return encode_png(
+                pixels,
+                level=level,
+                filter_type=filter_type,
+                metadata={"cell_size": cell_size},
+            )
+
+        return self._lookup(
+            ("png", digest, cell_size, mode, style, level, filter_type),
+            lambda: self._with_pixels(grid, digest, cell_size, mode, style, encode),
+        )
+
+    def _with_pixels(self, grid, digest, cell_size, mode, style, consume):
+        """Apply consume to the grid's pixels, mapped from the shared cache if possible."""
+        if self.shared is None:
+            return consume(grid_to_pixels(grid, cell_size, mode, style))
+
+        with self.shared.view(digest, cell_size, mode, style) as pixels:
+            if pixels is not None:
+                return consume(pixels)
+        pixels = grid_to_pixels(grid, cell_size, mode, style)
+        self.shared.publish(digest, cell_size, mode, pixels, style)
+        return consume(pixels)
+
+    def _lookup(self, key, create):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = create()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and the current number of entries."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        """Drop all cached images and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,232 @@
+import hashlib
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DEFAULT_CAPACITY = 256 * 1024 * 1024
+DEFAULT_SLOTS = 8192
+MAGIC = 0xBA7A7A01
+ALIGNMENT = 64
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "<u4"),
+        ("slots", "<u4"),
+        ("capacity", "<u8"),
+        ("cursor", "<u8"),
+        ("tick", "<u8"),
+        ("hits", "<u8"),
+        ("misses", "<u8"),
+        ("evictions", "<u8"),
+    ]
+)
+SLOT_DTYPE = np.dtype(
+    [
+        ("key", "<u8", (2,)),
+        ("offset", "<u8"),
+        ("nbytes", "<u8"),
+        ("shape", "<u4", (3,)),
+        ("ndim", "<u1"),
+        ("used", "<u1"),
+        ("pins", "<u4"),
+        ("last_used", "<u8"),
+    ]
+)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _entry_key(digest: str, cell_size: int, mode: str, style) -> np.ndarray:
+    style = tuple(style) if style is not None else ()
+    raw = hashlib.blake2b(
+        f"{digest}/{cell_size}/{mode}/{style}".encode(), digest_size=16
+    ).digest()
+    return np.frombuffer(raw, dtype="<u8")
+
+
+class SharedRenderCache:
+    """Rendered grid pixels published in shared memory for all workers on a host.
+
+    One segment holds a header, a table of entry slots and a data arena. Pixel
+    buffers are allocated in the arena as a ring: when it is full, the oldest
+    entries in the way are evicted. When every slot is taken, the least
+    recently used entry is evicted. Readers pin an entry while they use its
+    zero-copy view, and pinned entries are never overwritten.
+
+    The owning process calls create() and passes handle() to worker processes,
+    e.g. through a pool initializer, which call attach(*handle).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock, owner: bool):
+        self._shm = shm
+        self._lock = lock
+        self._owner = owner
+        self._header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+        if self._header["magic"] != MAGIC:
+            raise ValueError(f"{shm.name} is not a shared render cache")
+        self._table = np.ndarray(
+            (int(self._header["slots"]),),
+            SLOT_DTYPE,
+            buffer=shm.buf,
+            offset=HEADER_DTYPE.itemsize,
+        )
+        self._data_offset = _aligned(HEADER_DTYPE.itemsize + self._table.nbytes)
+
+    @classmethod
+    def create(cls, capacity: int = DEFAULT_CAPACITY, slots: int = DEFAULT_SLOTS):
+        """Allocate a new shared cache with capacity bytes of pixel storage."""
+        if capacity <= 0 or slots <= 0:
+            raise ValueError("capacity and slots must be positive")
+        table_end = _aligned(HEADER_DTYPE.itemsize + slots * SLOT_DTYPE.itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=table_end + capacity)
+        header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+        header["slots"] = slots
+        header["capacity"] = capacity
+        header["magic"] = MAGIC
+        del header
+        return cls(shm, multiprocessing.Lock(), owner=True)
+
+    @classmethod
+    def attach(cls, name: str, lock):
+        """Attach to a cache created by another process."""
+        return cls(shared_memory.SharedMemory(name=name), lock, owner=False)
+
+    def handle(self):
+        """Return (name, lock) for attach() in a worker process."""
+        return self._shm.name, self._lock
+
+    @contextmanager
+    def view(self, digest: str, cell_size: int, mode: str, style=None):
+        """Yield a read-only view of cached pixels, or None on a miss.
+
+        The entry is pinned for the duration of the with block; the view must
+        not be used after it.
+        """
+        key = _entry_key(digest, cell_size, mode, style)
+        with self._lock:
+            slot = self._find(key)
+            if slot is None:
+                self._header["misses"] += 1
+            else:
+                entry = self._table[slot]
+                entry["pins"] += 1
+                self._header["tick"] += 1
+                entry["last_used"] = self._header["tick"]
+                self._header["hits"] += 1
+                pixels = self._pixels(entry)
+        if slot is None:
+            yield None
+            return
+        try:
+            yield pixels
+        finally:
+            del pixels
+            with self._lock:
+                self._table[slot]["pins"] -= 1
+
+    def publish(
+        self, digest: str, cell_size: int, mode: str, pixels, style=None
+    ) -> bool:
+        """Copy rendered pixels into the cache; returns False if they do not fit."""
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+        key = _entry_key(digest, cell_size, mode, style)
+        capacity = int(self._header["capacity"])
+        nbytes = _aligned(pixels.nbytes)
+        if nbytes > capacity or pixels.ndim > 3:
+            return False
+
+        with self._lock:
+            if self._find(key) is not None:
+                return True
+
+            start = int(self._header["cursor"])
+            if start + nbytes > capacity:
+                start = 0
+            end = start + nbytes
+
+            table = self._table
+            in_the_way = (
+                (table["used"] == 1)
+                & (table["offset"] < end)
+                & (table["offset"] + table["nbytes"] > start)
+            )
+            if (table["pins"][in_the_way] > 0).any():
+                return False
+            self._evict(np.flatnonzero(in_the_way))
+
+            free = np.flatnonzero(table["used"] == 0)
+            if free.size:
+                slot = int(free[0])
+            else:
+                unpinned = np.flatnonzero(table["pins"] == 0)
+                if not unpinned.size:
+                    return False
+                slot = int(unpinned[np.argmin(table["last_used"][unpinned])])
+                self._evict([slot])
+
+            offset = self._data_offset + start
+            target = np.ndarray(pixels.shape, np.uint8, self._shm.buf, offset)
+            target[...] = pixels
+            del target
+
+            entry = table[slot]
+            entry["key"] = key
+            entry["offset"] = start
+            entry["nbytes"] = nbytes
+            entry["shape"] = pixels.shape + (0,) * (3 - pixels.ndim)
+            entry["ndim"] = pixels.ndim
+            entry["pins"] = 0
+            self._header["tick"] += 1
+            entry["last_used"] = self._header["tick"]
+            entry["used"] = 1
+            self._header["cursor"] = end
+        return True
+
+    def stats(self) -> dict:
+        """Return host-wide hit/miss/eviction counters and arena usage."""
+        with self._lock:
+            used = self._table["used"] == 1
+            return {
+                "hits": int(self._header["hits"]),
+                "misses": int(self._header["misses"]),
+                "evictions": int(self._header["evictions"]),
+                "size": int(used.sum()),
+                "bytes": int(self._table["nbytes"][used].sum()),
+                "capacity": int(self._header["capacity"]),
+            }
+
+    def close(self):
+        """Detach from the segment, destroying it if this process created it."""
+        del self._header, self._table
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def _find(self, key):
+        table = self._table
+        match = np.flatnonzero(
+            (table["used"] == 1)
+            & (table["key"][:, 0] == key[0])
+            & (table["key"][:, 1] == key[1])
+        )
+        return int(match[0]) if match.size else None
+
+    def _evict(self, slots):
+        if len(slots):
+            self._table["used"][slots] = 0
+            self._header["evictions"] += len(slots)
+
+    def _pixels(self, entry):
+        shape = tuple(int(n) for n in entry["shape"][: entry["ndim"]])
+        pixels = np.ndarray(
+            shape,
+            np.uint8,
+            buffer=self._shm.buf,
+            offset=self._data_offset + int(entry["offset"]),
+        )
+        pixels.flags.writeable = False
+        return pixels
@@ -1,99 +1,387 @@
+import mimetypes
 import os
-from io import BytesIO
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import matplotlib.gridspec as gridspec
 import matplotlib.pyplot as plt
 import numpy as np
 from dotenv import load_dotenv
 from google import genai
-from PIL import Image
+from google.genai import types
 from tqdm import tqdm
 
-from banana_agi.dataset_loader import grid_to_image, load_all_arc_tasks
+from banana_agi.dataset_loader import (
+    MIN_CELL_SIZE,
+    MODEL_TILE_SIZE,
+    RenderStyle,
+    choose_cell_size,
+    load_all_arc_tasks,
+)
+from banana_agi.decode_cache import DecodeCache, image_digest
+from banana_agi.decoding import (
+    DECODE_STRATEGIES,
+    align_cells,
+    aligned_pixels,
+    calibrate_palette,
+    decode_grid,
+    decode_images,
+    image_to_array,
+    load_image,
+)
+from banana_agi.detection import (
+    ContentBox,
+    detect_content_box,
+    detect_grid_dimensions,
+    detect_panels,
+    strip_background_lines,
+)
+from banana_agi.png_encoder import encode_png
+from banana_agi.render_cache import RenderCache
+from banana_agi.shared_cache import SharedRenderCache
+from banana_agi.storyboard import render_storyboard, storyboard_cell_size
 
 load_dotenv()
 
 FONT_SIZE = 16
+REQUEST_MODES = ("multipart", "storyboard")
+# Where generated images are saved as returned by the model
+OUTPUT_DIR = "predictions/single_outputs"
+
+PROMPT_RULES = """Rules:
+1. Study each training example in depth to understand the transformation pattern. It can be symetries, translations, rotations, any of these can be affected by the shapes in presence as if they were physical objects.
+2. Write a 5-line summary of what the transformation pattern is : the basis of it, caveats, any other observations.
+3. Apply the same pattern to the test input to generate the output. Respond ONLY with the image of the output, with correct colors. To generate it, just start from the test input image and modify according to the transformation pattern.
+
+Output grid:"""
+
+
+def write_output(path: str, data: bytes):
+    """Write a generated image's bytes to path, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def panel_image(img, panel: ContentBox):
+    """Crop an image to a detected panel and a pixel of background around it.
+
+    Panels found without a background fill the image, which is returned as
+    is to keep its metadata, such as a recorded cell size. The margin lets
+    decoding tell the background from the panel's content, and never reaches
+    another panel, as panels are further apart.
+    """
+    if panel.background is None:
+        return img
+    box = (
+        max(panel.left - 1, 0),
+        max(panel.top - 1, 0),
+        min(panel.right + 1, img.width),
+        min(panel.bottom + 1, img.height),
+    )
+    return img.crop(box)
+
+
+def payload_bytes(content_parts: list) -> int:
+    """Total size of the text and inline image data sent in a request."""
+    total = 0
+    for part in content_parts:
+        if isinstance(part, str):
+            total += len(part.encode())
+        elif part.inline_data is not None:
+            total += len(part.inline_data.data)
+    return total
 
 
 class ARCSolver:
-    def __init__(self):
+    def __init__(
+        self,
+        max_image_side: int = MODEL_TILE_SIZE,
+        min_cell_size: int = MIN_CELL_SIZE,
+        shared_cache: SharedRenderCache | None = None,
+        request_mode: str = "multipart",
+        render_style: RenderStyle | None = None,
+        decode_strategy: str = "center",
+        output_dir: str | None = OUTPUT_DIR,
+        crop_content: bool = True,
+        calibrate_colors: bool = False,
+        align_grid: bool = False,
+        decode_cache: DecodeCache | None = None,
+    ):
+        if request_mode not in REQUEST_MODES:
+            raise ValueError(f"Unknown request mode: {request_mode}")
+        if decode_strategy not in DECODE_STRATEGIES:
+            raise ValueError(f"Unknown decode strategy: {decode_strategy}")
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment")
         self.client = genai.Client(api_key=api_key)
-
-    def image_to_grid(self, image_path, expected_rows=None, expected_cols=None):
-        """Convert an image back to a grid for comparison."""
-        if isinstance(image_path, str):
-            img = Image.open(image_path).convert("RGB")
-        else:
-            # If it's already a PIL Image
-            img = image_path.convert("RGB")
-
-        # ARC color mapping (RGB values to grid values)
-        color_to_value = {
-            (0, 0, 0): 0,  # black
-            (0, 116, 217): 1,  # blue
-            (255, 65, 54): 2,  # red
-            (46, 204, 64): 3,  # green
-            (255, 220, 0): 4,  # yellow
-            (170, 170, 170): 5,  # gray
-            (240, 18, 190): 6,  # magenta
-            (255, 133, 27): 7,  # orange
-            (127, 219, 255): 8,  # sky blue
-            (135, 12, 37): 9,  # maroon
+        # Shared by solve_task and create_recap_image so each grid renders once;
+        # shared_cache extends this to every worker process on the host
+        self.render_cache = RenderCache(shared=shared_cache)
+        # Request images are sized to fit the model's image tiling
+        self.max_image_side = max_image_side
+        self.min_cell_size = min_cell_size
+        # Optional gridlines, frame or cell padding for request images
+        self.render_style = render_style
+        # "multipart" sends one image per grid, "storyboard" one image per task
+        self.request_mode = request_mode
+        # Payload size and latency of every request, for comparing modes
+        self.request_log = []
+        # How generated images are read back: cell centers or per-cell votes
+        self.decode_strategy = decode_strategy
+        # Generated images are written here in the background, or not at all
+        # when None, so disk I/O stays off the request path
+        self.output_dir = output_dir
+        self.output_writer = ThreadPoolExecutor(max_workers=1) if output_dir else None
+        self.pending_outputs = []
+        # Trim padding and frames around generated grids before decoding
+        self.crop_content = crop_content
+        # Fit the palette to each generated image's colors before matching
+        self.calibrate_colors = calibrate_colors
+        # Search small offsets and scales for misregistered generated grids
+        self.align_grid = align_grid
+        # Decoded grids persisted across runs, so re-scoring skips decoding
+        self.decode_cache = decode_cache
+
+    def image_to_grid(
+        self,
+        image_path,
+        expected_rows=None,
+        expected_cols=None,
+        cell_size=None,
+        strategy=None,
+        margin=None,
+        return_confidence=False,
+        crop=None,
+        calibrate=None,
+        align=None,
+    ):
+        """Convert an image back to a grid for comparison.
+
+        Without expected dimensions, cells are assumed to be about cell_size
+        pixels, falling back to the size recorded in the image metadata. Images with
+        neither have their dimensions detected from the pixels.
+        strategy defaults to the solver's decode_strategy; margin is the
+        fraction of each cell border left out of a vote. With
+        return_confidence, returns (grid, confidence) where confidence is a
+        (rows, cols) array in [0, 1] of how clearly each cell decoded.
+        crop defaults to the solver's crop_content and trims a uniform
+        non-ARC background around the grid first. calibrate defaults to the
+        solver's calibrate_colors and matches cells against a palette fitted
+        to the image's own colors. align defaults to the solver's align_grid
+        and decodes at the grid origin and cell size with the most uniform
+        cells.
+        """
+        img = load_image(image_path)
+        # Convert once; palettized ARC renders yield grid values directly
+        pixels = image_to_array(img)
+        uncropped, box = pixels, None
+        if self.crop_content if crop is None else crop:
+            box = detect_content_box(pixels)
+            pixels = pixels[box.top : box.bottom, box.left : box.right]
+        palette = None
+        if pixels.ndim == 3 and (
+            self.calibrate_colors if calibrate is None else calibrate
+        ):
+            palette = calibrate_palette(pixels)
+
+        if cell_size is None and "cell_size" in img.info:
+            cell_size = int(img.info["cell_size"])
+        if not (expected_rows and expected_cols) and cell_size is None:
+            if box is not None:
+                pixels = strip_background_lines(uncropped, box)
+            expected_rows, expected_cols, _ = detect_grid_dimensions(pixels)
+
+        height, width = pixels.shape[:2]
+        if not (expected_rows and expected_cols):
+            # Square cells of the recorded size; cropping may have trimmed a
+            # frame, gridline or padding, so round to whole cells
+            expected_cols = max(1, round(width / cell_size))
+            expected_rows = max(1, round(height / cell_size))
+        cell_width = width / expected_cols
+        cell_height = height / expected_rows
+
+        if self.align_grid if align is None else align:
+            alignment = align_cells(pixels, expected_rows, expected_cols, palette)
+            pixels = aligned_pixels(pixels, alignment)
+            cell_height, cell_width = alignment.cell_height, alignment.cell_width
+
+        # Decode every cell at once and match all colors in one pass
+        grid = decode_grid(
+            pixels,
+            expected_rows,
+            expected_cols,
+            cell_height,
+            cell_width,
+            strategy or self.decode_strategy,
+            margin,
+            return_confidence,
+            palette,
+        )
+        if return_confidence:
+            grid, confidence = grid
+            return grid.tolist(), confidence
+        return grid.tolist()
+
+    def decode_settings(self, cell_size=None) -> dict:
+        """Everything besides the image and target shape that decoding depends on."""
+        return {
+            "strategy": self.decode_strategy,
+            "crop": self.crop_content,
+            "calibrate": self.calibrate_colors,
+            "align": self.align_grid,
+            "cell_size": cell_size,
         }
 
-        width, height = img.size
+    def cached_decode(self, kind, image, expected_grid, cell_size, decode):
+        """Serve decode() from the decode cache when one is configured."""
+        if self.decode_cache is None or image is None:
+            return decode()
+        shape = None
+        if expected_grid is not None:
+            shape = [len(expected_grid), len(expected_grid[0]) if expected_grid else 0]
+            # Expected dimensions override the cell size when decoding
+            cell_size = None
+        settings = dict(self.decode_settings(cell_size), kind=kind)
+        return self.decode_cache.lookup(image_digest(image), shape, settings, decode)
+
+    def extract_grid_from_generated_image(
+        self, image, expected_grid=None, cell_size=None
+    ):
+        """Extract grid from API-generated image based on expected output dimensions.
+
+        Without an expected grid, cells are taken to be cell_size pixels when
+        given, and the dimensions are otherwise detected from the image.
+        Results come from the decode cache when the solver has one.
+        """
+        return self.cached_decode(
+            "grid",
+            image,
+            expected_grid,
+            cell_size,
+            lambda: self.decode_generated_image(image, expected_grid, cell_size),
+        )
 
-        # If expected dimensions are provided, calculate cell size accordingly
-        if expected_rows and expected_cols:
-            cell_width = width / expected_cols
-            cell_height = height / expected_rows
-        else:
-            # Default behavior - assume 20px cells
-            cell_width = cell_height = 20
-            expected_cols = width // int(cell_width)
-            expected_rows = height // int(cell_height)
+    def decode_generated_image(self, image, expected_grid=None, cell_size=None):
+        """Decode a generated image, bypassing the decode cache."""
+        if expected_grid is None:
+            if image is None:
+                return None
+            return self.image_to_grid(image, cell_size=cell_size)
 
-        grid = []
-        for y in range(expected_rows):
-            row = []
-            for x in range(expected_cols):
-                # Sample pixel from center of cell
-                pixel_x = int(x * cell_width + cell_width / 2)
-                pixel_y = int(y * cell_height + cell_height / 2)
-
-                # Ensure coordinates are within bounds
-                pixel_x = min(pixel_x, width - 1)
-                pixel_y = min(pixel_y, height - 1)
-
-                pixel_color = img.getpixel((pixel_x, pixel_y))
-
-                # Find closest color match
-                closest_value = 0
-                min_distance = float("inf")
-                for color, value in color_to_value.items():
-                    distance = sum((a - b) ** 2 for a, b in zip(pixel_color, color))
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_value = value
-
-                row.append(closest_value)
-            grid.append(row)
-
-        return grid
-
-    def extract_grid_from_generated_image(self, image, expected_grid):
-        """Extract grid from API-generated image based on expected output dimensions."""
         expected_rows = len(expected_grid)
         expected_cols = len(expected_grid[0]) if expected_grid else 0
 
         if expected_rows == 0 or expected_cols == 0:
             return None
 
-        return self.image_to_grid(image, expected_rows, expected_cols)
+        return self.image_to_grid(image, expected_rows, expected_cols, cell_size)
+
+    def extract_panel_grids(self, image, expected_grid=None):
+        """Decode every grid panel of a generated image, in reading order."""
+        img = load_image(image)
+        return [
+            self.extract_grid_from_generated_image(
+                panel_image(img, panel), expected_grid
+            )
+            for panel in detect_panels(image_to_array(img))
+        ]
+
+    def extract_prediction(self, image, expected_grid=None):
+        """Extract the predicted grid from a generated image that may hold several.
+
+        When the model draws several panels (say the test input beside its
+        answer), the one whose aspect ratio best matches the expected grid is
+        decoded; without an expected grid, or on ties, the last panel is, as
+        the answer usually comes last. Results come from the decode cache
+        when the solver has one.
+        """
+        if image is None:
+            return None
+        return self.cached_decode(
+            "prediction",
+            image,
+            expected_grid,
+            None,
+            lambda: self.decode_prediction(image, expected_grid),
+        )
+
+    def decode_prediction(self, image, expected_grid=None):
+        """Pick and decode the predicted panel, bypassing the decode cache."""
+        img = load_image(image)
+        panels = detect_panels(image_to_array(img))
+        panel = panels[-1]
+        if expected_grid:
+            expected_ratio = np.log(len(expected_grid[0]) / len(expected_grid))
+            panel = min(
+                reversed(panels),
+                key=lambda box: abs(
+                    np.log((box.right - box.left) / (box.bottom - box.top))
+                    - expected_ratio
+                ),
+            )
+        return self.decode_generated_image(panel_image(img, panel), expected_grid)
+
+    def extract_grids_from_generated_images(
+        self, images, expected_grids=None, workers=None
+    ):
+        """Extract grids from many generated images at once, in order.
+
+        Grids whose expected dimensions are missing are detected from the image.
+        With a decode cache, only the images it misses are batch decoded.
+        """
+        if expected_grids is None:
+            expected_grids = [None] * len(images)
+        shapes = [
+            (len(grid), len(grid[0])) if grid and grid[0] else None
+            for grid in expected_grids
+        ]
+
+        def decode(images, shapes):
+            return decode_images(
+                images,
+                shapes,
+                strategy=self.decode_strategy,
+                workers=workers,
+                crop=self.crop_content,
+                calibrate=self.calibrate_colors,
+                align=self.align_grid,
+            )
+
+        if self.decode_cache is None:
+            return decode(images, shapes)
+
+        settings = dict(self.decode_settings(), kind="batch")
+        grids = [None] * len(images)
+        keys = {}
+        for i, (image, shape) in enumerate(zip(images, shapes)):
+            if image is None:
+                continue
+            key = self.decode_cache.key(image_digest(image), shape, settings)
+            found, grids[i] = self.decode_cache.get(key)
+            if not found:
+                keys[i] = key
+        misses = list(keys)
+        decoded = decode([images[i] for i in misses], [shapes[i] for i in misses])
+        for i, grid in zip(misses, decoded):
+            self.decode_cache.put(keys[i], grid)
+            grids[i] = grid
+        return grids
+
+    def save_output(self, data: bytes, task_name: str, test_idx: int, mime_type=None):
+        """Queue a generated image for writing to output_dir without waiting."""
+        if self.output_writer is None:
+            return
+        extension = mimetypes.guess_extension(mime_type or "") or ".png"
+        path = os.path.join(self.output_dir, f"{task_name}_{test_idx}{extension}")
+        self.pending_outputs.append(self.output_writer.submit(write_output, path, data))
+
+    def flush_outputs(self):
+        """Wait for queued generated images to be written, raising any error."""
+        pending, self.pending_outputs = self.pending_outputs, []
+        for future in pending:
+            future.result()
 
     def parse_grid_from_response(self, response_text):
         """Parse grid data from Gemini response."""
@@ -159,8 +447,8 @@ class ARCSolver:
         for i, train_ex in enumerate(train_examples[:3]):  # Limit to 3 examples
             # Training input (left column)
             ax_input = fig.add_subplot(gs[i, 0])
-            train_input_img = grid_to_image(train_ex["input"])
-            ax_input.imshow(np.array(train_input_img))
+            train_input_pixels = self.render_cache.pixels(train_ex["input"])
+            ax_input.imshow(train_input_pixels)
             ax_input.set_title(
                 f"Train {i + 1} Input",
                 fontsize=FONT_SIZE,
@@ -171,8 +459,8 @@ class ARCSolver:
 
             # Training output (second column)
             ax_output = fig.add_subplot(gs[i, 1])
-            train_output_img = grid_to_image(train_ex["output"])
-            ax_output.imshow(np.array(train_output_img))
+            train_output_pixels = self.render_cache.pixels(train_ex["output"])
+            ax_output.imshow(train_output_pixels)
             ax_output.set_title(
                 f"Train {i + 1} Output",
                 fontsize=FONT_SIZE,
@@ -184,8 +472,8 @@ class ARCSolver:
         # Right side: Test case (third and fourth columns)
         # Test input
         ax_test_input = fig.add_subplot(gs[0, 2:])
-        test_input_img = grid_to_image(test_example["input"])
-        ax_test_input.imshow(np.array(test_input_img))
+        test_input_pixels = self.render_cache.pixels(test_example["input"])
+        ax_test_input.imshow(test_input_pixels)
         ax_test_input.set_title(
             "Test Input", fontsize=FONT_SIZE, color="blue", fontweight="bold"
         )
@@ -194,8 +482,8 @@ class ARCSolver:
         # Predicted output
         ax_pred_output = fig.add_subplot(gs[1, 2:])
         if prediction:
-            predicted_output_img = grid_to_image(prediction)
-            ax_pred_output.imshow(np.array(predicted_output_img))
+            predicted_output_pixels = self.render_cache.pixels(prediction)
+            ax_pred_output.imshow(predicted_output_pixels)
             ax_pred_output.set_title(
                 "Predicted Output",
                 fontsize=FONT_SIZE,
@@ -223,8 +511,21 @@ class ARCSolver:
 
         # Expected output
         ax_expected = fig.add_subplot(gs[2, 2:])
-        expected_output_img = grid_to_image(test_example["output"])
-        ax_expected.imshow(np.array(expected_output_img))
+        expected_output = test_example.get("output")
+        if expected_output:
+            expected_output_pixels = self.render_cache.pixels(expected_output)
+            ax_expected.imshow(expected_output_pixels)
+        else:
+            ax_expected.text(
+                0.5,
+                0.5,
+                "No expected output",
+                ha="center",
+                va="center",
+                fontsize=FONT_SIZE,
+                color="red",
+                fontweight="bold",
+            )
         ax_expected.set_title(
             "Expected Output", fontsize=FONT_SIZE, color="green", fontweight="bold"
         )
@@ -237,82 +538,129 @@ class ARCSolver:
         plt.close(fig)  # Close figure to free memory
         print(f"Saved recap image: {filename}")
 
-    def solve_task(self, task_data: dict, task_name: str):
-        """Solve an ARC task using Gemini vision model."""
-        train_examples = task_data.get("train", [])
-        test_examples = task_data.get("test", [])
-
-        if not train_examples or not test_examples:
-            return []
+    def cell_size_for(self, grid: list[list[int]]) -> int:
+        """Cell size that fits a grid within the model's image tile budget."""
+        return choose_cell_size(np.shape(grid), self.max_image_side, self.min_cell_size)
+
+    def grid_part(self, grid: list[list[int]]) -> types.Part:
+        """Build a request image part from cached PNG bytes, encoded once per grid."""
+        return types.Part.from_bytes(
+            data=self.render_cache.png(
+                grid, cell_size=self.cell_size_for(grid), style=self.render_style
+            ),
+            mime_type="image/png",
+        )
 
-        predictions = []
+    def multipart_contents(self, train_examples: list[dict], test_example: dict):
+        """Build request contents with one image part per training and test grid."""
+        # Create images for this specific test case
+        test_input_img = self.grid_part(test_example["input"])
 
-        for test_idx, test_example in enumerate(test_examples):
-            # Create images for this specific test case
-            test_input_img = grid_to_image(test_example["input"])
+        # Create training example images
+        train_images = []
+        for i, train_ex in enumerate(train_examples):
+            train_input_img = self.grid_part(train_ex["input"])
+            train_output_img = self.grid_part(train_ex["output"])
+            train_images.extend([train_input_img, train_output_img])
 
-            # Create training example images
-            train_images = []
-            for i, train_ex in enumerate(train_examples):
-                train_input_img = grid_to_image(train_ex["input"])
-                train_output_img = grid_to_image(train_ex["output"])
-                train_images.extend([train_input_img, train_output_img])
-
-            # Prepare prompt
-            prompt = f"""You are solving an ARC (Abstraction and Reasoning Corpus) task. 
+        # Prepare prompt
+        prompt = f"""You are solving an ARC (Abstraction and Reasoning Corpus) task. 
 
 I will show you training examples as pairs of input-output grids (as images), followed by a test input grid. Your task is to identify the pattern from the training examples and apply it to generate the correct output image for the test input.
 
 Training examples ({len(train_examples)} pairs):
 """
 
-            for i in range(len(train_examples)):
-                prompt += f"Example {i + 1}: Input -> Output\n"
+        for i in range(len(train_examples)):
+            prompt += f"Example {i + 1}: Input -> Output\n"
 
-            prompt += """
+        prompt += f"""
 Test input (generate the output for this):
 
-Rules:
-1. Study each training example in depth to understand the transformation pattern. It can be symetries, translations, rotations, any of these can be affected by the shapes in presence as if they were physical objects.
-2. Write a 5-line summary of what the transformation pattern is : the basis of it, caveats, any other observations.
-3. Apply the same pattern to the test input to generate the output. Respond ONLY with the image of the output, with correct colors. To generate it, just start from the test input image and modify according to the transformation pattern.
+{PROMPT_RULES}"""
 
-Output grid:"""
+        # Create content with images
+        content_parts = [prompt]
 
-            # Create content with images
-            content_parts = [prompt]
+        # Add training images
+        for img in train_images:
+            content_parts.append(img)
 
-            # Add training images
-            for img in train_images:
-                content_parts.append(img)
+        # Add test input
+        content_parts.append(test_input_img)
 
-            # Add test input
-            content_parts.append(test_input_img)
+        return content_parts
 
+    def storyboard_contents(self, train_examples: list[dict], test_example: dict):
+        """Build request contents with the whole task composited into one image.
+
+        Returns the contents and the storyboard cell size.
+        """
+        cell_size = storyboard_cell_size(
+            train_examples, test_example["input"], min_cell_size=self.min_cell_size
+        )
+        storyboard = render_storyboard(train_examples, test_example["input"], cell_size)
+        prompt = f"""You are solving an ARC (Abstraction and Reasoning Corpus) task. 
+
+The image shows {len(train_examples)} training examples, one per row, each as an input grid, an arrow, then its output grid. The last row is the test input grid. Your task is to identify the pattern from the training examples and apply it to generate the correct output image for the test input.
+
+{PROMPT_RULES}"""
+        image_part = types.Part.from_bytes(
+            data=encode_png(np.asarray(storyboard)), mime_type="image/png"
+        )
+        return [prompt, image_part], cell_size
+
+    def solve_task(self, task_data: dict, task_name: str):
+        """Solve an ARC task using Gemini vision model."""
+        train_examples = task_data.get("train", [])
+        test_examples = task_data.get("test", [])
+
+        if not train_examples or not test_examples:
+            return []
+
+        predictions = []
+
+        for test_idx, test_example in enumerate(test_examples):
+            if self.request_mode == "storyboard":
+                content_parts, _ = self.storyboard_contents(
+                    train_examples, test_example
+                )
+            else:
+                content_parts = self.multipart_contents(train_examples, test_example)
+
+            start = time.perf_counter()
             response = self.client.models.generate_content(
                 model="gemini-2.5-flash-image-preview", contents=content_parts
             )
+            self.request_log.append(
+                {
+                    "task": task_name,
+                    "test_idx": test_idx,
+                    "mode": self.request_mode,
+                    "payload_bytes": payload_bytes(content_parts),
+                    "latency": time.perf_counter() - start,
+                }
+            )
             if hasattr(response, "text"):
                 print(response.text)
 
             predicted_grid = None
-            output_image = None
+            output_data = None
 
-            # Extract image from response
+            # Keep the raw response bytes: they are decoded in memory and key the
+            # decode cache, and saving them happens off-thread
             for part in response.candidates[0].content.parts:
                 if part.inline_data is not None:
-                    output_image = Image.open(BytesIO(part.inline_data.data))
-                    os.makedirs("predictions", exist_ok=True)
-                    output_image.save(
-                        f"predictions/single_outputs/{task_name}_{test_idx}.png"
+                    output_data = part.inline_data.data
+                    self.save_output(
+                        output_data, task_name, test_idx, part.inline_data.mime_type
                     )
                     break
 
             # Extract grid from generated image
-            expected_output = test_example["output"]
-            predicted_grid = self.extract_grid_from_generated_image(
-                output_image, expected_output
-            )
+            # Hidden test outputs are unknown; their dimensions are then detected
+            expected_output = test_example.get("output")
+            predicted_grid = self.extract_prediction(output_data, expected_output)
 
             predictions.append(predicted_grid)
 
@@ -384,6 +732,11 @@ def main():
         total_accuracy += accuracy
         total_tasks += 1
 
+    solver.flush_outputs()
+    print(f"Render cache: {solver.render_cache.stats()}")
+    if solver.decode_cache is not None:
+        print(f"Decode cache: {solver.decode_cache.stats()}")
+
     overall_accuracy = total_accuracy / total_tasks if total_tasks > 0 else 0
     print(f"\n{'=' * 50}")
     print(f"Overall accuracy: {overall_accuracy:.2%} ({total_tasks} tasks)")
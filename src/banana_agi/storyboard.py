@@ -0,0 +1,101 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from banana_agi.dataset_loader import MIN_CELL_SIZE, grid_to_pixels
+
+# A storyboard spans up to 2x2 of the model's 768px image tiles
+STORYBOARD_MAX_SIDE = 1536
+BACKGROUND = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+LABEL_HEIGHT = 14
+GAP = 8
+ARROW_WIDTH = 32
+
+
+def storyboard_rows(train_examples: list[dict], test_input) -> list[tuple]:
+    """List the (label, input grid, output grid or None) rows of a storyboard."""
+    rows = [
+        (f"Example {i + 1}", example["input"], example["output"])
+        for i, example in enumerate(train_examples)
+    ]
+    rows.append(("Test input", test_input, None))
+    return rows
+
+
+def storyboard_cell_size(
+    train_examples: list[dict],
+    test_input,
+    max_side: int = STORYBOARD_MAX_SIDE,
+    min_cell_size: int = MIN_CELL_SIZE,
+) -> int:
+    """Largest cell size keeping the whole storyboard within max_side pixels."""
+    rows = storyboard_rows(train_examples, test_input)
+    shapes = [
+        (np.shape(inp), np.shape(out) if out is not None else (0, 0))
+        for _, inp, out in rows
+    ]
+    height_cells = sum(max(inp[0], out[0]) for inp, out in shapes)
+    width_cells = max(inp[1] + out[1] for inp, out in shapes)
+
+    free_height = max_side - len(rows) * (LABEL_HEIGHT + GAP) - GAP
+    free_width = max_side - 2 * GAP - ARROW_WIDTH
+    cell_size = min(free_height // height_cells, free_width // width_cells)
+    return max(min_cell_size, cell_size)
+
+
+def render_storyboard(
+    train_examples: list[dict], test_input, cell_size: int
+) -> Image.Image:
+    """Composite a whole task into one labelled RGB image.
+
+    Each training pair is a row with its input, an arrow and its output; the
+    test input is the last row. Grid panels are rendered once and copied into
+    a preallocated canvas; only labels and arrows are drawn.
+    """
+    rows = []
+    for label, inp, out in storyboard_rows(train_examples, test_input):
+        panels = [grid_to_pixels(inp, cell_size)]
+        if out is not None:
+            panels.append(grid_to_pixels(out, cell_size))
+        rows.append((label, panels))
+
+    row_heights = [
+        LABEL_HEIGHT + max(p.shape[0] for p in panels) + GAP for _, panels in rows
+    ]
+    row_widths = [
+        sum(p.shape[1] for p in panels) + ARROW_WIDTH * (len(panels) - 1)
+        for _, panels in rows
+    ]
+    canvas = np.empty((GAP + sum(row_heights), 2 * GAP + max(row_widths), 3), np.uint8)
+    canvas[...] = BACKGROUND
+
+    labels = []
+    arrows = []
+    top = GAP
+    for (label, panels), row_height in zip(rows, row_heights):
+        labels.append((GAP, top, label))
+        y = top + LABEL_HEIGHT
+        x = GAP
+        for i, panel in enumerate(panels):
+            if i:
+                arrows.append((x, y + min(p.shape[0] for p in panels) // 2))
+                x += ARROW_WIDTH
+            canvas[y : y + panel.shape[0], x : x + panel.shape[1]] = panel
+            x += panel.shape[1]
+        top += row_height
+
+    img = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(img)
+    for x, y, label in labels:
+        draw.text((x, y), label, fill=TEXT_COLOR)
+    for x, y in arrows:
+        draw.line((x + 4, y, x + ARROW_WIDTH - 6, y), fill=TEXT_COLOR, width=2)
+        draw.polygon(
+            [
+                (x + ARROW_WIDTH - 4, y),
+                (x + ARROW_WIDTH - 10, y - 5),
+                (x + ARROW_WIDTH - 10, y + 5),
+            ],
+            fill=TEXT_COLOR,
+        )
+    return img
@@ -0,0 +1,60 @@
+import json
+import tarfile
+
+import numpy as np
+import pytest
+
+from banana_agi.archive import (
+    ShardedArchiveReader,
+    ShardedArchiveWriter,
+    export_dataset_archive,
+)
+from banana_agi.dataset_loader import grid_to_image
+
+
+class TestShardedArchive:
+    def test_round_trip_across_shards(self, tmp_path):
+        """Test that members are split into shards and read back by name."""
+        payloads = {f"task/train_{i}_input.png": bytes([i]) * 700 for i in range(5)}
+
+        with ShardedArchiveWriter(str(tmp_path), shard_size=2048) as writer:
+            for name, data in payloads.items():
+                writer.add(name, data)
+
+        with ShardedArchiveReader(str(tmp_path)) as reader:
+            assert len(reader.shards) > 1
+            for name, data in payloads.items():
+                assert reader.read_member(name) == data
+
+        # Shards stay regular tar files
+        with tarfile.open(tmp_path / reader.shards[0]) as tar:
+            assert tar.getnames()[0] == "task/train_0_input.png"
+
+    def test_rejects_duplicate_members(self, tmp_path):
+        """Test that a member name can only be written once."""
+        with ShardedArchiveWriter(str(tmp_path)) as writer:
+            writer.add("a.png", b"x")
+            with pytest.raises(ValueError):
+                writer.add("a.png", b"y")
+
+    def test_export_dataset_archive(self, tmp_path):
+        """Test random access to exported grids by (task, split, index)."""
+        dataset_dir = tmp_path / "dataset"
+        dataset_dir.mkdir()
+        task = {
+            "train": [{"input": [[1, 2]], "output": [[3], [4]]}],
+            "test": [{"input": [[5]], "output": [[6]]}],
+        }
+        (dataset_dir / "abc.json").write_text(json.dumps(task))
+
+        stats = export_dataset_archive(
+            str(dataset_dir), str(tmp_path / "archive"), workers=1
+        )
+
+        assert stats["grids"] == 4
+        with ShardedArchiveReader(str(tmp_path / "archive")) as reader:
+            img = reader.open_image("abc", "train", 0, "output")
+            assert np.array_equal(
+                np.array(img.convert("RGB")), np.array(grid_to_image([[3], [4]]))
+            )
+            assert "abc/test_0_output.png" in reader
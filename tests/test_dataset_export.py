@@ -0,0 +1,68 @@
+import json
+import os
+
+from PIL import Image
+
+from banana_agi.dataset_loader import MANIFEST_NAME, export_dataset
+
+
+def write_task(dataset_dir, name, value):
+    task = {
+        "train": [{"input": [[value, 0]], "output": [[0, value]]}],
+        "test": [{"input": [[value]]}],
+    }
+    with open(os.path.join(dataset_dir, f"{name}.json"), "w") as f:
+        json.dump(task, f)
+
+
+class TestExportDataset:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.task_values = {"task_a": 1, "task_b": 2}
+
+    def make_dataset(self, tmp_path):
+        dataset_dir = tmp_path / "dataset"
+        dataset_dir.mkdir()
+        for name, value in self.task_values.items():
+            write_task(dataset_dir, name, value)
+        return str(dataset_dir), str(tmp_path / "images")
+
+    def test_exports_every_grid(self, tmp_path):
+        """Test that every grid of every task is written as a PNG."""
+        dataset_dir, output_dir = self.make_dataset(tmp_path)
+
+        stats = export_dataset(dataset_dir, output_dir, workers=1)
+
+        assert stats["exported_tasks"] == 2
+        assert stats["grids"] == 6
+        assert sorted(os.listdir(os.path.join(output_dir, "task_a"))) == [
+            "test_0_input.png",
+            "train_0_input.png",
+            "train_0_output.png",
+        ]
+        img = Image.open(os.path.join(output_dir, "task_b", "train_0_input.png"))
+        assert img.size == (40, 20)
+        assert os.path.exists(os.path.join(output_dir, MANIFEST_NAME))
+
+    def test_rerun_skips_unchanged_tasks(self, tmp_path):
+        """Test that only changed or missing tasks are exported again."""
+        dataset_dir, output_dir = self.make_dataset(tmp_path)
+        export_dataset(dataset_dir, output_dir, workers=1)
+
+        assert export_dataset(dataset_dir, output_dir)["exported_tasks"] == 0
+
+        write_task(dataset_dir, "task_a", 3)
+        stats = export_dataset(dataset_dir, output_dir)
+        assert stats["exported_tasks"] == 1
+        assert stats["skipped_tasks"] == 1
+
+        assert export_dataset(dataset_dir, output_dir, force=True)["grids"] == 6
+
+    def test_process_pool_export(self, tmp_path):
+        """Test that the process pool exports the same files."""
+        dataset_dir, output_dir = self.make_dataset(tmp_path)
+
+        stats = export_dataset(dataset_dir, output_dir, workers=2)
+
+        assert stats["exported_tasks"] == 2
+        assert len(os.listdir(os.path.join(output_dir, "task_b"))) == 3
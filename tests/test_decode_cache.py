@@ -0,0 +1,96 @@
+from io import BytesIO
+
+from PIL import Image
+
+from banana_agi.dataset_loader import grid_to_image
+from banana_agi.decode_cache import DecodeCache, image_digest
+from banana_agi.solver import ARCSolver
+
+
+class TestDecodeCache:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.grid = [[1, 2, 3], [4, 5, 6]]
+        buffer = BytesIO()
+        grid_to_image(self.grid, cell_size=10).save(buffer, "PNG")
+        self.data = buffer.getvalue()
+
+    def test_image_digest_of_bytes_and_views(self):
+        """Test that bytes and views of one image share a digest, unlike its pixels."""
+        digest = image_digest(self.data)
+
+        assert image_digest(memoryview(self.data)) == digest
+        assert image_digest(Image.open(BytesIO(self.data))) != digest
+
+    def test_results_persist_across_cache_instances(self, tmp_path):
+        """Test that a second cache over the same directory skips decoding."""
+        calls = []
+
+        def decode():
+            calls.append(1)
+            return self.grid
+
+        first = DecodeCache(str(tmp_path))
+        second = DecodeCache(str(tmp_path))
+
+        assert first.lookup("digest", [2, 3], {}, decode) == self.grid
+        assert second.lookup("digest", [2, 3], {}, decode) == self.grid
+        assert len(calls) == 1
+        assert second.stats() == {"hits": 1, "misses": 0}
+
+    def test_key_depends_on_version_shape_and_settings(self, tmp_path):
+        """Test that decoder changes and other targets miss the cache."""
+        cache = DecodeCache(str(tmp_path))
+        key = cache.key("digest", [2, 3], {"strategy": "center"})
+
+        assert cache.key("digest", [3, 2], {"strategy": "center"}) != key
+        assert cache.key("digest", [2, 3], {"strategy": "vote"}) != key
+        assert (
+            DecodeCache(str(tmp_path), version=-1).key(
+                "digest", [2, 3], {"strategy": "center"}
+            )
+            != key
+        )
+
+    def test_solver_serves_repeated_decodes(self, tmp_path):
+        """Test that the solver decodes identical bytes once."""
+        solver = ARCSolver(decode_cache=DecodeCache(str(tmp_path)), output_dir=None)
+
+        first = solver.extract_grid_from_generated_image(self.data, self.grid)
+        second = solver.extract_grid_from_generated_image(self.data, self.grid)
+        prediction = solver.extract_prediction(self.data, self.grid)
+
+        assert first == second == prediction == self.grid
+        assert solver.decode_cache.stats() == {"hits": 1, "misses": 2}
+
+    def test_image_digest_of_palette_images(self):
+        """Test that palette images with equal indices but other colors differ."""
+        image = grid_to_image(self.grid, cell_size=10, mode="P")
+        recolored = image.copy()
+        recolored.putpalette([255 - value for value in image.getpalette()])
+        transparent = image.copy()
+        transparent.info["transparency"] = 0
+
+        digest = image_digest(image)
+
+        assert image_digest(image.copy()) == digest
+        assert image_digest(recolored) != digest
+        assert image_digest(transparent) != digest
+
+    def test_solver_caches_batch_decodes(self, tmp_path):
+        """Test that batch extraction only decodes images the cache misses."""
+        other = [[7, 8], [9, 1]]
+        buffer = BytesIO()
+        grid_to_image(other, cell_size=10).save(buffer, "PNG")
+        solver = ARCSolver(decode_cache=DecodeCache(str(tmp_path)), output_dir=None)
+
+        first = solver.extract_grids_from_generated_images(
+            [self.data, None], [self.grid, None]
+        )
+        second = solver.extract_grids_from_generated_images(
+            [self.data, buffer.getvalue()], [self.grid, None]
+        )
+
+        assert first == [self.grid, None]
+        assert second == [self.grid, other]
+        assert solver.decode_cache.stats() == {"hits": 1, "misses": 2}
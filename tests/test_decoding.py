@@ -0,0 +1,267 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from banana_agi.dataset_loader import grid_to_image
+from banana_agi.decoding import (
+    AMBIGUOUS,
+    align_cells,
+    aligned_pixels,
+    calibrate_palette,
+    cell_blocks,
+    classify_colors,
+    color_confidence,
+    decode_cells,
+    decode_grid,
+    decode_images,
+    image_to_array,
+    nearest_palette_colors,
+    palette_lut,
+    vote_cells,
+)
+from banana_agi.palette import ARC_COLORS
+
+
+def legacy_nearest(color):
+    """Per-pixel nearest-color search, as image_to_grid used to do it."""
+    closest_value = 0
+    min_distance = float("inf")
+    for value, palette_color in enumerate(ARC_COLORS):
+        distance = sum((a - b) ** 2 for a, b in zip(color, palette_color))
+        if distance < min_distance:
+            min_distance = distance
+            closest_value = value
+    return closest_value
+
+
+class TestVectorizedDecoding:
+    def test_nearest_palette_matches_per_pixel_search(self):
+        """Test that the broadcasted search agrees with the per-pixel loop."""
+        colors = np.random.default_rng(0).integers(0, 256, size=(500, 3))
+
+        expected = [legacy_nearest(tuple(color)) for color in colors]
+
+        assert nearest_palette_colors(colors.astype(np.uint8)).tolist() == expected
+
+    def test_decode_noisy_image(self):
+        """Test decoding an RGB render whose colors were perturbed."""
+        rng = np.random.default_rng(1)
+        grid = rng.integers(0, 10, size=(7, 9))
+        pixels = np.array(grid_to_image(grid, cell_size=10)).astype(np.int16)
+        noisy = np.clip(pixels + rng.integers(-20, 21, pixels.shape), 0, 255)
+
+        img = Image.fromarray(noisy.astype(np.uint8))
+        decoded = decode_cells(image_to_array(img), 7, 9, 10, 10)
+
+        assert np.array_equal(decoded, grid)
+
+    def test_palette_image_reads_indices(self):
+        """Test that palettized renders decode without color matching."""
+        pixels = image_to_array(grid_to_image([[3, 4]], cell_size=5, mode="P"))
+
+        assert pixels.ndim == 2
+        assert decode_cells(pixels, 1, 2, 5, 5).tolist() == [[3, 4]]
+
+
+class TestPaletteLookupTable:
+    def test_lookup_matches_exact_search(self):
+        """Test that table lookups agree with the exact nearest-color search."""
+        colors = np.random.default_rng(2).integers(0, 256, (20000, 3), dtype=np.uint8)
+
+        expected = nearest_palette_colors(colors)
+
+        for bits in (4, 6):
+            assert np.array_equal(classify_colors(colors, bits=bits), expected)
+
+    def test_palette_colors_have_unambiguous_bins(self):
+        """Test that exact ARC colors are resolved by the table alone."""
+        lut = palette_lut(6)
+        quantized = np.array(ARC_COLORS) >> 2
+
+        values = lut[quantized[:, 0], quantized[:, 1], quantized[:, 2]]
+
+        assert values.tolist() == list(range(10))
+        assert not lut.flags.writeable
+        assert (lut == AMBIGUOUS).mean() < 0.1
+
+    def test_table_is_saved_and_reloaded(self, tmp_path):
+        """Test that a cache directory persists the table between loads."""
+        built = palette_lut(3, str(tmp_path))
+        files = list(tmp_path.glob("arc_lut_3bit_*.npy"))
+
+        palette_lut.cache_clear()
+        loaded = palette_lut(3, str(tmp_path))
+
+        assert len(files) == 1
+        assert np.array_equal(built, loaded)
+
+    def test_invalid_bits(self):
+        """Test that table sizes outside 1-8 bits are rejected."""
+        with pytest.raises(ValueError):
+            palette_lut(9)
+
+
+class TestVotingDecoder:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.grid = np.random.default_rng(3).integers(0, 10, size=(6, 8))
+        self.pixels = np.array(grid_to_image(self.grid, cell_size=12))
+
+    def test_vote_survives_corrupted_centers(self):
+        """Test that a smudge over every cell center is outvoted."""
+        pixels = self.pixels.copy()
+        for offset in range(5, 8):
+            pixels[offset::12, :] = (255, 255, 255)
+            pixels[:, offset::12] = (255, 255, 255)
+
+        assert not np.array_equal(decode_cells(pixels, 6, 8, 12, 12), self.grid)
+        assert np.array_equal(vote_cells(pixels, 6, 8, 12, 12), self.grid)
+
+    def test_trimmed_vote_ignores_borders(self):
+        """Test that a margin drops thick cell borders from the vote."""
+        pixels = self.pixels.copy()
+        for offset in (0, 1, 2, 9, 10, 11):
+            pixels[offset::12, :] = (0, 0, 0)
+            pixels[:, offset::12] = (0, 0, 0)
+
+        decoded = decode_grid(pixels, 6, 8, 12, 12, strategy="trimmed")
+
+        assert not np.array_equal(vote_cells(pixels, 6, 8, 12, 12), self.grid)
+        assert np.array_equal(decoded, self.grid)
+
+    def test_fractional_cells_match_block_view(self):
+        """Test that gathered fractional cells match the reshaped block view."""
+        blocks = cell_blocks(self.pixels, 6, 8, 12, 12, margin=0.25)
+        gathered = cell_blocks(self.pixels, 6, 8, 12.0001, 12.0001, margin=0.25)
+
+        assert blocks.shape == (6, 6, 8, 6, 3)
+        assert np.array_equal(blocks, gathered)
+
+
+class TestDecodeConfidence:
+    def test_color_confidence_drops_with_drift(self):
+        """Test that palette colors score 1 and drifting colors score less."""
+        palette = np.array(ARC_COLORS, dtype=np.uint8)
+        blue, red = palette[1].astype(float), palette[2].astype(float)
+        drifted = np.array([blue + t * (red - blue) for t in (0, 0.1, 0.2, 0.3)])
+
+        confidence = color_confidence(drifted.astype(np.uint8))
+
+        assert np.allclose(color_confidence(palette), 1)
+        assert np.all(np.diff(confidence) < 0)
+
+    def test_vote_purity_flags_smudged_cell(self):
+        """Test that a partially overwritten cell gets a lower vote purity."""
+        pixels = np.array(grid_to_image([[1, 2], [3, 4]], cell_size=10))
+        pixels[:4, :10] = ARC_COLORS[6]
+
+        grid, confidence = decode_grid(
+            pixels, 2, 2, 10, 10, strategy="vote", return_confidence=True
+        )
+
+        assert grid.tolist() == [[1, 2], [3, 4]]
+        assert confidence.tolist() == [[0.6, 1.0], [1.0, 1.0]]
+
+
+class TestBatchDecoding:
+    def test_batch_matches_single_decodes(self):
+        """Test that batched decoding returns the same grids in input order."""
+        rng = np.random.default_rng(5)
+        grids = [rng.integers(0, 10, size=shape) for shape in [(3, 4), (5, 2), (6, 6)]]
+        images = []
+        for grid in grids:
+            buffer = io.BytesIO()
+            grid_to_image(grid, cell_size=9).resize((100, 80)).save(buffer, "PNG")
+            images.append(buffer.getvalue())
+        images.append(grid_to_image(grids[0], cell_size=9, mode="P"))
+
+        decoded = decode_images(
+            images + [None], [grid.shape for grid in grids] + [None, (1, 1)]
+        )
+
+        assert decoded[:3] == [grid.tolist() for grid in grids]
+        assert decoded[3] == grids[0].tolist()
+        assert decoded[4] is None
+
+    def test_batch_vote_strategy(self):
+        """Test that voting strategies are available to batches."""
+        image = grid_to_image([[7, 8]], cell_size=10)
+
+        assert decode_images([image], [(1, 2)], strategy="trimmed") == [[[7, 8]]]
+
+
+class TestPaletteCalibration:
+    def setup_method(self):
+        """Set up test fixtures."""
+        rng = np.random.default_rng(7)
+        self.grid = rng.integers(0, 10, size=(10, 10))
+        pixels = np.array(grid_to_image(self.grid, cell_size=12)).astype(float)
+        self.noise = rng.normal(0, 5, pixels.shape)
+        self.pixels = pixels
+
+    def drifted(self, gain, offset):
+        """Apply a global gain and offset drift plus fixed noise."""
+        pixels = self.pixels * gain + offset + self.noise
+        return np.clip(pixels, 0, 255).astype(np.uint8)
+
+    def test_washed_out_colors(self):
+        """Test that calibration recovers a washed-out, brightened image."""
+        pixels = self.drifted(0.6, 90)
+
+        palette = calibrate_palette(pixels)
+        calibrated = decode_grid(pixels, 10, 10, 12, 12, palette=palette)
+
+        assert not np.array_equal(decode_grid(pixels, 10, 10, 12, 12), self.grid)
+        assert np.array_equal(calibrated, self.grid)
+
+    def test_undrifted_palette_is_unchanged(self):
+        """Test that calibrating a clean render keeps the ARC colors."""
+        palette = calibrate_palette(self.drifted(1.0, 0))
+
+        assert np.abs(palette.astype(int) - np.array(ARC_COLORS)).max() <= 3
+
+
+class TestGridAlignment:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.grid = np.random.default_rng(8).integers(0, 10, size=(4, 30))
+        self.pixels = np.array(grid_to_image(self.grid, cell_size=16))
+
+    def test_nominal_alignment_is_kept(self):
+        """Test that a correctly registered render needs no adjustment."""
+        alignment = align_cells(self.pixels, 4, 30)
+
+        assert alignment[:4] == (0, 0, 16, 16)
+        assert alignment.purity == 1
+
+    def test_shrunken_offset_grid_is_realigned(self):
+        """Test that a grid drawn 4% small and off-origin decodes after alignment."""
+        shrunk = grid_to_image(self.grid, cell_size=16).resize((461, 64), Image.NEAREST)
+        canvas = np.zeros_like(self.pixels)
+        canvas[:, 3:464] = np.array(shrunk)
+
+        alignment = align_cells(canvas, 4, 30)
+        decoded = decode_grid(
+            aligned_pixels(canvas, alignment),
+            4,
+            30,
+            alignment.cell_height,
+            alignment.cell_width,
+        )
+
+        assert not np.array_equal(decode_grid(canvas, 4, 30, 16, 16), self.grid)
+        assert np.array_equal(decoded, self.grid)
+
+    def test_batch_decoding_with_alignment(self):
+        """Test that decode_images aligns each image like image_to_grid does."""
+        shrunk = grid_to_image(self.grid, cell_size=16).resize((461, 64), Image.NEAREST)
+        canvas = np.zeros_like(self.pixels)
+        canvas[:, 3:464] = np.array(shrunk)
+        images = [Image.fromarray(canvas), Image.fromarray(self.pixels)]
+
+        for strategy in ("center", "trimmed"):
+            decoded = decode_images(images, [(4, 30)] * 2, strategy, align=True)
+            assert decoded == [self.grid.tolist()] * 2
+        assert decode_images(images, [(4, 30)] * 2)[0] != self.grid.tolist()
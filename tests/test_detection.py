@@ -0,0 +1,113 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from banana_agi.dataset_loader import RenderStyle, grid_to_image, grid_to_pixels
+from banana_agi.detection import (
+    crop_to_content,
+    detect_content_box,
+    detect_count,
+    detect_grid_dimensions,
+    detect_panels,
+)
+
+
+class TestGridDimensionDetection:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.grid = np.random.default_rng(4).integers(0, 10, size=(7, 12))
+
+    def test_exact_render(self):
+        """Test that a plain render yields its dimensions with high confidence."""
+        dimensions = detect_grid_dimensions(grid_to_pixels(self.grid, cell_size=16))
+
+        assert (dimensions.rows, dimensions.cols) == (7, 12)
+        assert dimensions.confidence > 0.5
+
+    def test_resized_jpeg_with_gridlines(self):
+        """Test detection on a resampled, lossy render with gridlines."""
+        img = grid_to_image(self.grid, cell_size=16, style=RenderStyle(gridline=1))
+        buffer = io.BytesIO()
+        img.resize((250, 140)).save(buffer, "JPEG", quality=70)
+        pixels = np.asarray(Image.open(buffer).convert("RGB"))
+
+        assert detect_grid_dimensions(pixels)[:2] == (7, 12)
+
+    def test_uniform_image_has_no_confidence(self):
+        """Test that an image without transitions is reported as one cell."""
+        assert detect_count(np.zeros(99)) == (1, 0.0)
+
+
+class TestContentCrop:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.grid = np.random.default_rng(6).integers(0, 10, size=(5, 7))
+        self.pixels = grid_to_pixels(self.grid, cell_size=20)
+
+    def test_white_padding_is_cropped(self):
+        """Test that a grid pasted onto a white canvas is located exactly."""
+        canvas = np.full((200, 260, 3), 255, dtype=np.uint8)
+        canvas[30:130, 50:190] = self.pixels
+
+        box = detect_content_box(canvas)
+
+        assert box[:4] == (30, 130, 50, 190)
+        assert box.background == (255, 255, 255)
+
+    def test_frame_is_cropped(self):
+        """Test that a render frame is trimmed back to the cells."""
+        framed = grid_to_pixels(self.grid, cell_size=20, style=RenderStyle(border=4))
+
+        assert np.array_equal(crop_to_content(framed), self.pixels)
+
+    def test_black_edges_are_kept(self):
+        """Test that an ARC-colored background is not mistaken for padding."""
+        grid = np.zeros((6, 6), dtype=int)
+        grid[2:4, 2:4] = 3
+        pixels = grid_to_pixels(grid, cell_size=10)
+
+        assert detect_content_box(pixels)[:4] == (0, 60, 0, 60)
+        assert detect_content_box(pixels, allow_palette_background=True)[:4] == (
+            20,
+            40,
+            20,
+            40,
+        )
+
+
+class TestPanelDetection:
+    def test_side_by_side_panels_with_label(self):
+        """Test that two grids and a text label yield the two grid panels."""
+        canvas = Image.new("RGB", (400, 200), (255, 255, 255))
+        canvas.paste(grid_to_image([[1, 2], [3, 4]], cell_size=30), (20, 40))
+        canvas.paste(grid_to_image([[0, 0, 0]], cell_size=30), (200, 60))
+        ImageDraw.Draw(canvas).text((20, 10), "Input", fill=(0, 0, 0))
+
+        panels = detect_panels(np.asarray(canvas))
+
+        assert [panel[:4] for panel in panels] == [
+            (40, 100, 20, 80),
+            (60, 90, 200, 290),
+        ]
+
+    def test_single_grid_is_one_panel(self):
+        """Test that a plain render is a single full-image panel."""
+        pixels = grid_to_pixels([[1, 2], [3, 4]], cell_size=10)
+
+        assert [panel[:4] for panel in detect_panels(pixels)] == [(0, 20, 0, 20)]
+
+    def test_grid_with_background_gridlines_is_one_panel(self):
+        """Test that cells separated by white gridlines are not split into panels."""
+        grid = np.random.default_rng(3).integers(0, 10, size=(5, 6))
+        style = RenderStyle(padding=2)
+        canvas = Image.new("RGB", (400, 200), (255, 255, 255))
+        canvas.paste(grid_to_image(grid, cell_size=24, style=style), (20, 20))
+        canvas.paste(grid_to_image(grid[:3, :3], cell_size=24, style=style), (250, 40))
+
+        panels = detect_panels(np.asarray(canvas))
+
+        assert [panel[:4] for panel in panels] == [
+            (22, 138, 22, 162),
+            (42, 110, 252, 320),
+        ]
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from banana_agi.dataset_loader import (
+    ARC_COLORS,
+    RenderStyle,
+    cell_template,
+    atlas_views,
+    choose_cell_size,
+    grid_to_image,
+    has_arc_palette,
+    render_atlas,
+)
+
+
+class TestGridToImage:
+    def test_matches_per_pixel_rendering(self):
+        """Test that every pixel of each cell carries the cell's palette color."""
+        grid = [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+        cell_size = 7
+
+        pixels = np.array(grid_to_image(grid, cell_size=cell_size))
+
+        assert pixels.shape == (2 * cell_size, 5 * cell_size, 3)
+        for y, row in enumerate(grid):
+            for x, value in enumerate(row):
+                block = pixels[
+                    y * cell_size : (y + 1) * cell_size,
+                    x * cell_size : (x + 1) * cell_size,
+                ]
+                assert (block == ARC_COLORS[value]).all()
+
+    def test_image_mode_and_size(self):
+        """Test that the rendered image keeps the RGB mode and cell geometry."""
+        img = grid_to_image([[1, 2, 3]], cell_size=20)
+
+        assert img.mode == "RGB"
+        assert img.size == (60, 20)
+
+    def test_palette_mode_image(self):
+        """Test that palette mode stores grid values as indices into the ARC palette."""
+        grid = [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+
+        img = grid_to_image(grid, cell_size=4, mode="P")
+
+        assert img.mode == "P"
+        assert has_arc_palette(img)
+        assert np.array_equal(np.array(img)[::4, ::4], grid)
+        assert np.array_equal(
+            np.array(img.convert("RGB")), np.array(grid_to_image(grid, cell_size=4))
+        )
+
+    def test_rgb_image_has_no_arc_palette(self):
+        """Test that RGB renders are not mistaken for palettized renders."""
+        assert not has_arc_palette(grid_to_image([[1, 2]]))
+
+    def test_gridline_style(self):
+        """Test that gridlines enclose every cell and the frame surrounds the grid."""
+        style = RenderStyle(gridline=1, border=2)
+        pixels = np.array(grid_to_image([[1, 2], [3, 4]], cell_size=5, style=style))
+
+        assert pixels.shape == (2 * 5 + 1 + 4, 2 * 5 + 1 + 4, 3)
+        line_color = pixels[0, 0]
+        for offset in (2, 7, 12):
+            assert (pixels[offset, 2:-2] == line_color).all()
+            assert (pixels[2:-2, offset] == line_color).all()
+        assert (pixels[3:7, 3:7] == ARC_COLORS[1]).all()
+
+    def test_padding_style_in_palette_mode(self):
+        """Test that padded cells keep their value at the center in palette mode."""
+        style = RenderStyle(padding=2)
+        pixels = np.array(grid_to_image([[7, 8]], cell_size=8, mode="P", style=style))
+
+        assert pixels[4, 4] == 7
+        assert pixels[4, 12] == 8
+        assert pixels[0, 0] not in (7, 8)
+
+    def test_cell_templates_are_built_once(self):
+        """Test that templates are cached per (cell_size, style)."""
+        style = RenderStyle(gridline=2)
+        assert cell_template(12, style) is cell_template(12, style)
+        with pytest.raises(ValueError):
+            cell_template(4, RenderStyle(padding=2))
+
+    def test_rejects_non_2d_grid(self):
+        """Test that malformed grids are rejected."""
+        with pytest.raises(ValueError):
+            grid_to_image([1, 2, 3])
+
+    def test_choose_cell_size_fits_budget(self):
+        """Test that cell sizes fill the pixel budget without going under the minimum."""
+        assert choose_cell_size((30, 30), max_side=384) == 12
+        assert choose_cell_size((3, 5), max_side=384) == 76
+        assert choose_cell_size((30, 30), max_side=100, min_cell_size=8) == 8
+
+
+class TestRenderAtlas:
+    def test_atlas_views_match_grid_to_image(self):
+        """Test that each atlas slice holds the same pixels as a single render."""
+        grids = [[[1, 2], [3, 4]], [[5]], [[6, 7], [8, 9]], [[0, 1, 2]]]
+
+        for mode in ("RGB", "P"):
+            atlas, slices = render_atlas(grids, cell_size=3, mode=mode)
+            views = atlas_views(atlas, slices)
+
+            assert len(views) == len(grids)
+            assert sum(view.size for view in views) == atlas.size
+            for grid, view in zip(grids, views):
+                assert np.array_equal(
+                    view, np.array(grid_to_image(grid, cell_size=3, mode=mode))
+                )
+
+    def test_empty_batch(self):
+        """Test that rendering no grids yields an empty atlas."""
+        atlas, slices = render_atlas([])
+
+        assert atlas.size == 0
+        assert slices == []
@@ -1,6 +1,12 @@
 import json
+from io import BytesIO
+from types import SimpleNamespace
 
-from banana_agi.dataset_loader import grid_to_image
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from banana_agi.dataset_loader import RenderStyle, grid_to_image
 from banana_agi.solver import ARCSolver
 
 
@@ -122,33 +128,258 @@ class TestImageToGridExtraction:
         for i in range(10):
             assert extracted_colors[i][0] == i, f"Color {i} not extracted correctly"
 
+    def test_palette_image_conversion(self):
+        """Test that palettized renders decode through their palette indices."""
+        test_grid = [[i, (i + 3) % 10, (i + 7) % 10] for i in range(10)]
 
-if __name__ == "__main__":
-    # Run tests manually if executed directly
-    test_instance = TestImageToGridExtraction()
-    test_instance.setup_method()
+        test_image = grid_to_image(test_grid, mode="P")
+        extracted_grid = self.solver.extract_grid_from_generated_image(
+            test_image, test_grid
+        )
+
+        assert extracted_grid == test_grid
+
+    def test_gridline_image_conversion(self):
+        """Test that grids rendered with gridlines and a frame still decode."""
+        test_grid = [[(i * j) % 10 for j in range(10)] for i in range(10)]
+
+        test_image = grid_to_image(
+            test_grid, style=RenderStyle(gridline=2, border=2, padding=1)
+        )
+        extracted_grid = self.solver.extract_grid_from_generated_image(
+            test_image, test_grid
+        )
+
+        assert extracted_grid == test_grid
+
+    def test_recorded_cell_size_without_expected_dimensions(self):
+        """Test that the cell size stored in a cached PNG drives decoding."""
+        test_grid = [[1, 2, 3], [4, 5, 6]]
+
+        png_bytes = self.solver.render_cache.png(test_grid, cell_size=12)
+        extracted_grid = self.solver.image_to_grid(Image.open(BytesIO(png_bytes)))
+
+        assert extracted_grid == test_grid
+
+    def test_vote_strategy_on_resampled_image(self):
+        """Test decoding a resized render by voting over each cell."""
+        test_grid = [[1, 2, 3], [4, 5, 6]]
+        test_image = grid_to_image(test_grid, cell_size=20).resize((97, 61))
+
+        extracted_grid = self.solver.image_to_grid(test_image, 2, 3, strategy="vote")
+
+        assert extracted_grid == test_grid
+
+    def test_extract_without_expected_grid(self):
+        """Test that dimensions are detected when no expected grid is known."""
+        test_grid = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 0, 1, 2]]
+        test_image = grid_to_image(test_grid, cell_size=20).resize((150, 110))
+
+        extracted_grid = self.solver.extract_grid_from_generated_image(test_image)
+
+        assert extracted_grid == test_grid
+
+    def test_cell_size_without_expected_grid(self):
+        """Test that a given cell size decodes a grid whose dimensions are unknown."""
+        test_grid = [[3, 3], [3, 3]]
+        test_image = grid_to_image(test_grid, cell_size=10)
+
+        assert self.solver.extract_grid_from_generated_image(test_image) == [[3]]
+        assert (
+            self.solver.extract_grid_from_generated_image(test_image, cell_size=10)
+            == test_grid
+        )
+
+    def test_solve_task_without_expected_output(self, tmp_path, monkeypatch):
+        """Test that a hidden test example without an output is solved and recapped."""
+        monkeypatch.chdir(tmp_path)
+        test_output = [[1, 2, 3], [4, 5, 6]]
+        data = self.solver.render_cache.png(test_output, cell_size=20)
+        part = SimpleNamespace(
+            inline_data=SimpleNamespace(data=data, mime_type="image/png")
+        )
+        response = SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))]
+        )
+        solver = ARCSolver(output_dir=None)
+        monkeypatch.setattr(
+            solver.client.models, "generate_content", lambda **kwargs: response
+        )
+        task_data = {
+            "train": [{"input": [[1, 1], [2, 2]], "output": [[2, 2], [1, 1]]}],
+            "test": [{"input": [[3, 3], [4, 4]]}],
+        }
+
+        predictions = solver.solve_task(task_data, "hidden")
+
+        assert predictions == [test_output]
+        assert (tmp_path / "predictions" / "recap_images" / "hidden_0.png").exists()
+
+    def test_image_to_grid_with_confidence(self):
+        """Test that a confidence array matching the grid shape is returned."""
+        test_grid = [[1, 2, 3], [4, 5, 6]]
+        test_image = grid_to_image(test_grid, cell_size=10)
+
+        extracted_grid, confidence = self.solver.image_to_grid(
+            test_image, 2, 3, return_confidence=True
+        )
 
-    try:
-        test_instance.test_basic_image_to_grid_conversion()
-        print("✅ Basic conversion test passed")
+        assert extracted_grid == test_grid
+        assert confidence.shape == (2, 3)
+        assert (confidence == 1).all()
+
+    def test_extract_many_generated_images(self):
+        """Test batch extraction with known and unknown expected grids."""
+        first = [[1, 2], [3, 4]]
+        second = [[5, 6, 7]]
+        images = [grid_to_image(first), grid_to_image(second)]
+
+        extracted = self.solver.extract_grids_from_generated_images(
+            images, [first, None]
+        )
 
-        test_instance.test_rectangular_grid_conversion()
-        print("✅ Rectangular grid test passed")
+        assert extracted == [first, second]
+
+    def test_batch_and_single_decodes_agree(self):
+        """Test that batch extraction reads recorded cell sizes like single decodes."""
+        images = [
+            self.solver.render_cache.png([[3, 3, 3], [3, 3, 3]], cell_size=10),
+            self.solver.render_cache.png(
+                [[1, 2, 3, 4], [5, 6, 7, 8]],
+                cell_size=12,
+                style=RenderStyle(gridline=1),
+            ),
+            grid_to_image([[1, 2], [3, 4]], cell_size=15),
+        ]
+
+        single = [self.solver.extract_grid_from_generated_image(i) for i in images]
+
+        assert single[0] == [[3, 3, 3], [3, 3, 3]]
+        assert self.solver.extract_grids_from_generated_images(images) == single
+
+    def test_decode_response_bytes_and_save_in_background(self, tmp_path):
+        """Test decoding inline image bytes and writing them off the request path."""
+        test_grid = [[1, 2], [3, 4]]
+        data = self.solver.render_cache.png(test_grid, cell_size=10)
+        solver = ARCSolver(output_dir=str(tmp_path / "single_outputs"))
+
+        extracted_grid = solver.extract_grid_from_generated_image(
+            memoryview(data), test_grid
+        )
+        solver.save_output(data, "task", 0, "image/png")
+        solver.flush_outputs()
 
-        test_instance.test_large_grid_conversion()
-        print("✅ Large grid test passed")
+        assert extracted_grid == test_grid
+        assert (tmp_path / "single_outputs" / "task_0.png").read_bytes() == data
 
-        test_instance.test_real_arc_task_data()
-        print("✅ Real ARC data test passed")
+    def test_outputs_not_saved_without_output_dir(self):
+        """Test that output_dir=None disables saving generated images."""
+        solver = ARCSolver(output_dir=None)
 
-        test_instance.test_edge_cases()
-        print("✅ Edge cases test passed")
+        solver.save_output(b"data", "task", 0)
 
-        test_instance.test_color_accuracy()
-        print("✅ Color accuracy test passed")
+        assert solver.pending_outputs == []
 
-        print("\n🎉 All tests passed! Image-to-grid extraction is working correctly.")
+    def test_padded_generated_image(self):
+        """Test that whitespace around a generated grid is cropped before decoding."""
+        test_grid = [[1, 2, 3], [4, 5, 6]]
+        canvas = Image.new("RGB", (200, 150), (255, 255, 255))
+        canvas.paste(grid_to_image(test_grid, cell_size=20), (40, 30))
 
-    except Exception as e:
-        print(f"❌ Test failed: {e}")
-        raise
+        extracted_grid = self.solver.extract_grid_from_generated_image(
+            canvas, test_grid
+        )
+
+        assert extracted_grid == test_grid
+
+    def test_recorded_cell_size_of_styled_render(self):
+        """Test that cropping a styled render's frame keeps its last row and column."""
+        test_grid = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 1, 2, 3]]
+        styles = [
+            RenderStyle(gridline=1),
+            RenderStyle(border=3),
+            RenderStyle(padding=2),
+            RenderStyle(gridline=2, border=4, padding=2),
+        ]
+
+        for style in styles:
+            data = self.solver.render_cache.png(test_grid, cell_size=12, style=style)
+            extracted_grid = self.solver.image_to_grid(Image.open(BytesIO(data)))
+            assert extracted_grid == test_grid, style
+
+    def test_calibrated_colors(self):
+        """Test that a darkened generated image decodes with color calibration."""
+        test_grid = [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+        pixels = np.array(grid_to_image(test_grid, cell_size=10)) * 0.6
+        test_image = Image.fromarray(pixels.astype(np.uint8))
+
+        extracted_grid = self.solver.image_to_grid(test_image, 2, 5, calibrate=True)
+
+        assert extracted_grid == test_grid
+
+    def test_aligned_decoding_of_scaled_image(self):
+        """Test that a grid drawn slightly too small decodes with alignment."""
+        test_grid = [[(row + col) % 10 for col in range(30)] for row in range(2)]
+        canvas = Image.new("RGB", (480, 32), (0, 0, 0))
+        canvas.paste(grid_to_image(test_grid, cell_size=16).resize((461, 32)))
+
+        extracted_grid = self.solver.image_to_grid(canvas, 2, 30, align=True)
+
+        assert self.solver.image_to_grid(canvas, 2, 30) != test_grid
+        assert extracted_grid == test_grid
+
+    def test_extract_many_aligned_images(self):
+        """Test that batch extraction honors the solver's align_grid setting."""
+        test_grid = [[(row + col) % 10 for col in range(30)] for row in range(2)]
+        canvas = Image.new("RGB", (480, 32), (0, 0, 0))
+        canvas.paste(grid_to_image(test_grid, cell_size=16).resize((461, 32)))
+        solver = ARCSolver(output_dir=None, align_grid=True)
+
+        extracted = solver.extract_grids_from_generated_images([canvas], [test_grid])
+
+        assert self.solver.extract_grids_from_generated_images(
+            [canvas], [test_grid]
+        ) != [test_grid]
+        assert extracted == [test_grid]
+
+    def test_prediction_from_multi_panel_image(self):
+        """Test that the panel shaped like the expected grid is decoded."""
+        test_input = [[1, 8], [8, 1], [1, 8]]
+        test_output = [[2, 3, 4], [5, 6, 7]]
+        canvas = Image.new("RGB", (300, 160), (255, 255, 255))
+        canvas.paste(grid_to_image(test_input, cell_size=20), (20, 20))
+        canvas.paste(grid_to_image(test_output, cell_size=20), (120, 40))
+
+        prediction = self.solver.extract_prediction(canvas, test_output)
+        panels = self.solver.extract_panel_grids(canvas)
+
+        assert prediction == test_output
+        assert panels == [test_input, test_output]
+
+    def test_prediction_with_background_gridlines(self):
+        """Test that a grid drawn with white gridlines decodes as one grid."""
+        test_grid = np.random.default_rng(5).integers(0, 10, size=(5, 6)).tolist()
+        canvas = Image.new("RGB", (220, 180), (255, 255, 255))
+        for gap in (1, 2, 3):
+            style = RenderStyle(padding=gap)
+            render = grid_to_image(test_grid, cell_size=20 + 2 * gap, style=style)
+            canvas.paste(render, (20, 20))
+
+            assert self.solver.extract_prediction(canvas, test_grid) == test_grid
+            assert self.solver.extract_prediction(canvas) == test_grid
+
+    def test_prediction_below_a_label(self):
+        """Test that a single grid panel is cropped away from its text label."""
+        test_grid = [[1, 2, 3, 4, 5], [6, 7, 8, 9, 1], [2, 3, 4, 5, 6], [7, 8, 9, 1, 2]]
+        canvas = Image.new("RGB", (300, 260), (255, 255, 255))
+        ImageDraw.Draw(canvas).text((50, 20), "Output grid", fill=(0, 0, 0))
+        canvas.paste(grid_to_image(test_grid, cell_size=40), (50, 60))
+
+        assert self.solver.extract_prediction(canvas, test_grid) == test_grid
+        assert self.solver.extract_prediction(canvas) == test_grid
+        assert self.solver.extract_panel_grids(canvas) == [test_grid]
+
+
+if __name__ == "__main__":
+    # Run every test in this file when executed directly
+    raise SystemExit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,47 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from banana_agi.dataset_loader import grid_to_image, grid_to_pixels
+from banana_agi.png_encoder import PNG_FILTERS, encode_png
+from banana_agi.render_cache import RenderCache
+
+
+class TestEncodePng:
+    @pytest.mark.parametrize("mode", ["RGB", "P"])
+    @pytest.mark.parametrize("filter_type", sorted(PNG_FILTERS))
+    def test_round_trip_through_pil(self, mode, filter_type):
+        """Test that PIL decodes the encoded bytes back to the rendered colors."""
+        grid = [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [9, 9, 1, 1, 0]]
+
+        data = encode_png(grid_to_pixels(grid, 5, mode), filter_type=filter_type)
+        decoded = Image.open(BytesIO(data))
+
+        assert decoded.size == (25, 15)
+        assert np.array_equal(
+            np.array(decoded.convert("RGB")), np.array(grid_to_image(grid, 5))
+        )
+
+    def test_rejects_unknown_filter(self):
+        """Test that unsupported filters are rejected."""
+        with pytest.raises(ValueError):
+            encode_png(grid_to_pixels([[1]]), filter_type="paeth")
+
+    def test_metadata_is_readable_by_pil(self):
+        """Test that metadata entries are exposed through Image.info."""
+        data = encode_png(grid_to_pixels([[1]]), metadata={"cell_size": 12})
+
+        assert Image.open(BytesIO(data)).info["cell_size"] == "12"
+
+    def test_cache_reuses_encoded_bytes(self):
+        """Test that the render cache encodes each grid once."""
+        cache = RenderCache()
+
+        first = cache.png([[1, 2], [3, 4]])
+        second = cache.png([[1, 2], [3, 4]])
+
+        assert first is second
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hits"] == 1
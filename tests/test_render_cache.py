@@ -0,0 +1,49 @@
+import numpy as np
+
+from banana_agi.dataset_loader import grid_to_image, grid_to_pixels
+from banana_agi.render_cache import RenderCache, grid_digest
+
+
+class TestRenderCache:
+    def test_grid_digest_depends_on_content_and_shape(self):
+        """Test that digests match for equal grids and differ for reshaped ones."""
+        assert grid_digest([[1, 2], [3, 4]]) == grid_digest(np.array([[1, 2], [3, 4]]))
+        assert grid_digest([[1, 2], [3, 4]]) != grid_digest([[1, 2, 3, 4]])
+
+    def test_hits_and_misses(self):
+        """Test that repeated renders of the same grid are served from the cache."""
+        cache = RenderCache()
+        grid = [[1, 2], [3, 4]]
+
+        first = cache.render(grid)
+        second = cache.render([[1, 2], [3, 4]])
+        cache.render(grid, mode="P")
+
+        assert first is second
+        assert np.array_equal(np.array(first), np.array(grid_to_image(grid)))
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_pixels_are_cached_read_only_arrays(self):
+        """Test that pixel arrays are returned without a PIL round-trip."""
+        cache = RenderCache()
+
+        pixels = cache.pixels([[1, 2], [3, 4]], cell_size=4)
+
+        assert np.array_equal(pixels, grid_to_pixels([[1, 2], [3, 4]], cell_size=4))
+        assert not pixels.flags.writeable
+        assert cache.pixels([[1, 2], [3, 4]], cell_size=4) is pixels
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted past maxsize."""
+        cache = RenderCache(maxsize=2)
+
+        cache.render([[1]])
+        cache.render([[2]])
+        cache.render([[1]])
+        cache.render([[3]])
+
+        assert len(cache) == 2
+        assert cache.stats()["evictions"] == 1
+        cache.render([[1]])
+        assert cache.stats()["hits"] == 2
@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from banana_agi.dataset_loader import grid_to_image, grid_to_pixels
+from banana_agi.render_cache import RenderCache, grid_digest
+from banana_agi.shared_cache import SharedRenderCache
+
+worker_cache = None
+
+
+def attach_worker(name, lock):
+    global worker_cache
+    worker_cache = SharedRenderCache.attach(name, lock)
+
+
+def worker_lookup(grid):
+    with worker_cache.view(grid_digest(grid), 20, "P") as pixels:
+        return None if pixels is None else pixels[0, 0].item()
+
+
+class TestSharedRenderCache:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = SharedRenderCache.create(capacity=64 * 1024, slots=8)
+
+    def teardown_method(self):
+        self.cache.close()
+
+    def publish(self, grid, cell_size=20, mode="P"):
+        pixels = grid_to_pixels(grid, cell_size, mode)
+        return self.cache.publish(grid_digest(grid), cell_size, mode, pixels)
+
+    def test_publish_and_view(self):
+        """Test that published pixels are mapped back read-only."""
+        grid = [[1, 2], [3, 4]]
+        assert self.publish(grid, mode="RGB")
+
+        with self.cache.view(grid_digest(grid), 20, "RGB") as pixels:
+            assert np.array_equal(pixels, np.array(grid_to_image(grid)))
+            assert not pixels.flags.writeable
+        with self.cache.view(grid_digest(grid), 20, "P") as pixels:
+            assert pixels is None
+
+        assert self.cache.stats()["hits"] == 1
+        assert self.cache.stats()["misses"] == 1
+
+    def test_ring_eviction_respects_capacity(self):
+        """Test that old entries are evicted once the arena is full."""
+        for value in range(10):
+            assert self.publish([[value] * 10] * 10)
+
+        stats = self.cache.stats()
+        assert stats["bytes"] <= stats["capacity"]
+        assert stats["evictions"] > 0
+        with self.cache.view(grid_digest([[9] * 10] * 10), 20, "P") as pixels:
+            assert pixels[0, 0] == 9
+
+    def test_pinned_entries_are_not_overwritten(self):
+        """Test that an entry in use blocks publishes that would overwrite it."""
+        grid = [[1] * 10] * 10
+        self.publish(grid)
+
+        with self.cache.view(grid_digest(grid), 20, "P") as pixels:
+            for value in range(2, 10):
+                self.publish([[value] * 10] * 10)
+            assert (pixels == 1).all()
+
+    def test_oversized_pixels_are_not_published(self):
+        """Test that buffers larger than the arena are rejected."""
+        assert not self.publish([[1] * 30] * 30, mode="RGB")
+
+    def test_workers_map_published_pixels(self):
+        """Test that worker processes see pixels published by the parent."""
+        self.publish([[7]])
+
+        with ProcessPoolExecutor(
+            2, initializer=attach_worker, initargs=self.cache.handle()
+        ) as pool:
+            assert list(pool.map(worker_lookup, [[[7]], [[8]]])) == [7, None]
+
+    def test_render_cache_uses_shared_pixels(self):
+        """Test that RenderCache renders through the shared cache."""
+        render_cache = RenderCache(shared=self.cache)
+
+        render_cache.png([[5, 6]])
+        other = RenderCache(shared=self.cache)
+        img = other.render([[5, 6]], mode="P")
+
+        assert np.array_equal(np.array(img), grid_to_pixels([[5, 6]], mode="P"))
+        assert self.cache.stats()["hits"] == 1
+
+    def test_rendered_images_outlive_shared_entries(self):
+        """Test that images rendered from shared pixels survive their eviction."""
+        grid = [[1] * 10] * 10
+        self.publish(grid)
+        img = RenderCache(shared=self.cache).render(grid, mode="P")
+
+        for value in range(2, 10):
+            self.publish([[value] * 10] * 10)
+
+        with self.cache.view(grid_digest(grid), 20, "P") as pixels:
+            assert pixels is None
+        assert (np.array(img) == 1).all()
+
+
+def test_rejects_invalid_capacity():
+    """Test that empty caches cannot be created."""
+    with pytest.raises(ValueError):
+        SharedRenderCache.create(capacity=0)
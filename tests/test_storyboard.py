@@ -0,0 +1,41 @@
+import numpy as np
+
+from banana_agi.dataset_loader import grid_to_pixels
+from banana_agi.storyboard import (
+    GAP,
+    LABEL_HEIGHT,
+    render_storyboard,
+    storyboard_cell_size,
+)
+
+
+class TestStoryboard:
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.train_examples = [
+            {"input": [[1, 2], [3, 4]], "output": [[5, 6, 7]]},
+            {"input": [[8]], "output": [[9], [1]]},
+        ]
+        self.test_input = [[2, 2, 2], [3, 3, 3]]
+
+    def test_panels_are_copied_into_canvas(self):
+        """Test that the first input panel sits below its label with exact pixels."""
+        cell_size = 10
+        img = render_storyboard(self.train_examples, self.test_input, cell_size)
+        canvas = np.array(img)
+
+        top = GAP + LABEL_HEIGHT
+        panel = grid_to_pixels(self.train_examples[0]["input"], cell_size)
+        assert np.array_equal(
+            canvas[top : top + panel.shape[0], GAP : GAP + panel.shape[1]], panel
+        )
+
+    def test_cell_size_fits_budget(self):
+        """Test that the storyboard stays within the requested side length."""
+        cell_size = storyboard_cell_size(
+            self.train_examples, self.test_input, max_side=400, min_cell_size=1
+        )
+        img = render_storyboard(self.train_examples, self.test_input, cell_size)
+
+        assert max(img.size) <= 400
+        assert cell_size > 1